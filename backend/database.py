@@ -57,6 +57,21 @@ try:
 except OperationalError as e:
     print(f"⚠️ Database connection failed: {e}")
 
+
+# Extensions the schema relies on (trigram indexes for report search)
+def _create_extensions():
+    if engine.dialect.name != "postgresql":
+        return
+    try:
+        with engine.connect() as conn:
+            conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        print("✅ pg_trgm extension available")
+    except Exception as e:
+        print(f"⚠️ Could not create pg_trgm extension: {e}")
+
+_create_extensions()
+
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
 Base = declarative_base()
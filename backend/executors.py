@@ -0,0 +1,140 @@
+import asyncio
+import contextlib
+import functools
+import importlib
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional, TypeVar
+
+from fastapi import HTTPException
+
+T = TypeVar("T")
+
+# Short blocking calls from async endpoints: DB queries/commits, saving an upload.
+IO_WORKERS = int(os.getenv("IO_WORKERS", "8"))
+# Long CPU/IO-heavy work: backup restores, zip extraction, variant rendering.
+# Kept separate and small so a big import cannot starve the short calls above.
+HEAVY_WORKERS = int(os.getenv("HEAVY_WORKERS", "2"))
+
+# Bytes per read/write when streaming an upload to disk.
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+# GIA PDF parsing (PyMuPDF renders, NumPy passes, barcodes) runs in worker processes
+# so it neither holds the GIL nor stalls the event loop. PDF_QUEUE_SIZE more jobs may
+# wait for a worker; beyond that a request waits up to PDF_QUEUE_TIMEOUT seconds for
+# a slot and is then turned away with 503.
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 2)))
+PDF_QUEUE_SIZE = int(os.getenv("PDF_QUEUE_SIZE", str(PDF_WORKERS * 4)))
+PDF_QUEUE_TIMEOUT = float(os.getenv("PDF_QUEUE_TIMEOUT", "10"))
+# Modules every PDF worker imports before taking work, so the first job does not pay for it.
+PDF_WORKER_PRELOAD = ("fitz", "numpy", "PIL.Image", "qrcode", "barcode", "pdf.router", "pdf.mini_reports")
+
+io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="blocking-io")
+heavy_executor = ThreadPoolExecutor(max_workers=HEAVY_WORKERS, thread_name_prefix="heavy-work")
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_lock = threading.Lock()
+_pdf_slots = asyncio.Semaphore(PDF_WORKERS + PDF_QUEUE_SIZE)
+
+
+async def run_blocking(fn: Callable[..., T], *args, executor: ThreadPoolExecutor = io_executor, **kwargs) -> T:
+    """Run a blocking call in a bounded pool so the event loop keeps serving other requests."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+
+async def run_heavy(fn: Callable[..., T], *args, **kwargs) -> T:
+    return await run_blocking(fn, *args, executor=heavy_executor, **kwargs)
+
+
+def _preload_pdf_worker():
+    for name in PDF_WORKER_PRELOAD:
+        importlib.import_module(name)
+
+
+def _noop():
+    return None
+
+
+def get_pdf_pool() -> ProcessPoolExecutor:
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, initializer=_preload_pdf_worker)
+        return _pdf_pool
+
+
+def _discard_pdf_pool(pool: ProcessPoolExecutor):
+    """Drop a pool whose worker died so the next job starts a fresh one."""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is pool:
+            _pdf_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def warm_pdf_pool():
+    """Start every PDF worker now (at app startup) instead of on the first upload."""
+    pool = get_pdf_pool()
+    for _ in range(PDF_WORKERS):
+        pool.submit(_noop)
+
+
+@contextlib.asynccontextmanager
+async def pdf_slot(timeout: Optional[float] = PDF_QUEUE_TIMEOUT):
+    """
+    Admission to the PDF pool: 503 if no slot frees up within `timeout`
+    seconds (at once for 0). None waits as long as it takes.
+    """
+    busy = HTTPException(status_code=503, detail="PDF processing is busy, retry shortly",
+                         headers={"Retry-After": "5"})
+    if timeout is None:
+        await _pdf_slots.acquire()
+    elif timeout <= 0 or not _pdf_slots.locked():
+        if _pdf_slots.locked():
+            raise busy
+        await _pdf_slots.acquire()  # a slot is free: returns without waiting
+    else:
+        try:
+            await asyncio.wait_for(_pdf_slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise busy
+    try:
+        yield
+    finally:
+        _pdf_slots.release()
+
+
+async def run_in_pdf_pool(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Submit to the PDF pool without admission; callers hold a pdf_slot()."""
+    pool = get_pdf_pool()
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(pool, functools.partial(fn, *args, **kwargs))
+    except BrokenProcessPool:
+        _discard_pdf_pool(pool)
+        raise
+
+
+async def run_pdf(fn: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Run a PDF parse in the process pool. fn and its arguments/result must be
+    picklable (module-level function, bytes in, dict out).
+    """
+    async with pdf_slot():
+        return await run_in_pdf_pool(fn, *args, **kwargs)
+
+
+async def save_upload(upload, dest_path: str):
+    """Stream an UploadFile to dest_path chunk by chunk without blocking the loop."""
+    f = await run_blocking(open, dest_path, "wb")
+    try:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            await run_blocking(f.write, chunk)
+    finally:
+        await run_blocking(f.close)
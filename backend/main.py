@@ -6,9 +6,14 @@ import sys
 
 from database import Base, engine
 from auth.router import router as auth_router
-from reports.router import router as reports_router, public_router
+from reports.router import router as reports_router, public_router, variants_router
+from reports.jobs import resume_ingest_jobs, start_job_sweeper
+from reports.gc import start_gc_scheduler
+from reports.storage import ShardedStaticFiles
+from executors import warm_pdf_pool
 from pdf.router import router as pdf_router
 from pdf.mini_reports import router as mini_reports_router
+from pdf.bulk import router as bulk_pdf_router
 from models import *
 from auto_migrate import run_alembic_migrations
 from dotenv import load_dotenv
@@ -29,7 +34,7 @@ app = FastAPI(title="IGI FastAPI Backend")
 # -------------------------
 # STATIC DIRECTORIES
 # -------------------------
-OUTPUT_DIR = "output"
+OUTPUT_DIR = os.getenv("OUTPUT_DIR", "output")
 UPLOAD_DIR = "uploads"
 MINI_REPORTS_DIR = "mini-reports-output"
 
@@ -40,7 +45,8 @@ os.makedirs(MINI_REPORTS_DIR, exist_ok=True)
 # Mount public folders
 app.mount("/files", StaticFiles(directory=OUTPUT_DIR), name="files")
 app.mount("/mini-reports", StaticFiles(directory=MINI_REPORTS_DIR), name="mini-reports")
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
+# stored names resolve to their shard (uploads/<aa>/<bb>/<name>) or the old flat file
+app.mount("/uploads", ShardedStaticFiles(directory=UPLOAD_DIR), name="uploads")
 
 # -------------------------
 # CORS
@@ -59,8 +65,17 @@ app.add_middleware(
 app.include_router(auth_router)
 app.include_router(reports_router)
 app.include_router(public_router)
+app.include_router(variants_router)
 app.include_router(pdf_router)
 app.include_router(mini_reports_router)
+app.include_router(bulk_pdf_router)
+
+@app.on_event("startup")
+def resume_background_jobs():
+    resume_ingest_jobs()
+    start_job_sweeper()
+    start_gc_scheduler()
+    warm_pdf_pool()
 
 @app.get("/")
 def home():
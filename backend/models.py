@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, func, Index,Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, func, Index,Boolean
 from database import Base
 from datetime import datetime
 
@@ -34,15 +34,59 @@ class Report(Base):
     notice_image = Column(Boolean, default=False)
     igi_logo = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # change marker for incremental backups; bumped on every ORM update
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), nullable=True)
 
     __table_args__ = (
         Index("ix_reports_style_created", "style_number", "created_at"),
+        # keyset pagination of GET /reports/ (newest first)
+        Index("ix_reports_created_id", "created_at", "id"),
+        # substring search (ILIKE '%q%') on PostgreSQL; needs the pg_trgm extension
+        Index(
+            "ix_reports_report_no_trgm",
+            "report_no",
+            postgresql_using="gin",
+            postgresql_ops={"report_no": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_reports_style_number_trgm",
+            "style_number",
+            postgresql_using="gin",
+            postgresql_ops={"style_number": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
     )
 
+class CacheVersion(Base):
+    """Shared version of an in-process cache; bumped on every invalidation so all API workers see it."""
+    __tablename__ = "cache_versions"
+
+    name = Column(String(64), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
 class UploadedPDF(Base):
     __tablename__ = "uploaded_pdfs"
 
     id = Column(Integer, primary_key=True, index=True)
     report_no = Column(String, nullable=False)
     filename = Column(String, nullable=False)
-    uploaded_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    uploaded_at = Column(DateTime, default=datetime.utcnow)
+
+
+class IngestJob(Base):
+    """Background /reports/upload-xlsx run; survives restarts so it can be resumed or reported."""
+    __tablename__ = "ingest_jobs"
+
+    id = Column(String(36), primary_key=True)
+    status = Column(String(16), nullable=False, default="queued", index=True)  # queued | running | done | failed
+    workbook_path = Column(String(512), nullable=False)
+    params = Column(Text, nullable=False)  # JSON: upload-xlsx form options
+    total_rows = Column(Integer, nullable=False, default=0)
+    rows_done = Column(Integer, nullable=False, default=0)
+    rows_skipped = Column(Integer, nullable=False, default=0)
+    rows_failed = Column(Integer, nullable=False, default=0)
+    result = Column(Text, nullable=True)  # JSON: same shape as the upload-xlsx response
+    checkpoint = Column(Text, nullable=True)  # JSON: committed-row offset and partial result, for resuming
+    error = Column(String(2000), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
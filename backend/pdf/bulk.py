@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+import zipfile
+from typing import Awaitable, Callable, List, Tuple
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+
+from auth.dependencies import get_current_user
+from executors import PDF_WORKERS, run_blocking
+from pdf.cache import parse_pdf_cached
+
+router = APIRouter(prefix="/pdf", tags=["PDF Processing"], dependencies=[Depends(get_current_user)])
+
+# PDFs parsed at once for one bulk request (each holds a PDF pool slot).
+BULK_PDF_CONCURRENCY = int(os.getenv("BULK_PDF_CONCURRENCY", str(PDF_WORKERS)))
+BULK_PDF_MAX_FILES = int(os.getenv("BULK_PDF_MAX_FILES", "500"))
+# Per PDF, also the cap for a zip member's uncompressed size.
+BULK_PDF_MAX_BYTES = int(os.getenv("BULK_PDF_MAX_BYTES", str(50 * 1024 * 1024)))
+
+Loader = Callable[[], Awaitable[bytes]]
+
+
+def _upload_loader(upload: UploadFile) -> Loader:
+    async def load() -> bytes:
+        await upload.seek(0)
+        return await upload.read()
+    return load
+
+
+def _zip_member_loader(zf: zipfile.ZipFile, member: zipfile.ZipInfo) -> Loader:
+    async def load() -> bytes:
+        if member.file_size > BULK_PDF_MAX_BYTES:
+            raise ValueError(f"larger than {BULK_PDF_MAX_BYTES} bytes")
+        return await run_blocking(zf.read, member)
+    return load
+
+
+def _is_zip(upload: UploadFile) -> bool:
+    name = (upload.filename or "").lower()
+    return name.endswith(".zip") or upload.content_type in ("application/zip", "application/x-zip-compressed")
+
+
+def _pdf_sources(files: List[UploadFile]) -> List[Tuple[str, Loader]]:
+    """(file name, loader) for every PDF uploaded directly or inside a zip."""
+    sources = []
+    for upload in files:
+        if not _is_zip(upload):
+            sources.append((upload.filename, _upload_loader(upload)))
+            continue
+        try:
+            zf = zipfile.ZipFile(upload.file)
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=400, detail=f"{upload.filename} is not a valid zip file")
+        for member in zf.infolist():
+            base = os.path.basename(member.filename)
+            if member.is_dir() or not base.lower().endswith(".pdf") or base.startswith("._"):
+                continue  # folders, other files, macOS resource forks
+            sources.append((member.filename, _zip_member_loader(zf, member)))
+    return sources
+
+
+async def _parse(mode: str, filename: str, load: Loader) -> dict:
+    pdf_bytes = await load()
+    if len(pdf_bytes) > BULK_PDF_MAX_BYTES:
+        raise ValueError(f"larger than {BULK_PDF_MAX_BYTES} bytes")
+    if not pdf_bytes.startswith(b"%PDF"):
+        raise ValueError("not a PDF file")
+    # waits for a pool slot instead of failing with 503 like single uploads
+    return await parse_pdf_cached(mode, pdf_bytes, os.path.basename(filename), timeout=None)
+
+
+def _line(obj: dict) -> bytes:
+    return (json.dumps(obj) + "\n").encode("utf-8")
+
+
+async def _iter_results(mode: str, sources: List[Tuple[str, Loader]]):
+    """
+    One NDJSON line per PDF as soon as it is parsed (completion order, so use
+    `index` to match inputs), then a summary line. At most BULK_PDF_CONCURRENCY
+    PDFs are loaded or parsing at a time.
+    """
+    pending = {}
+    queue = iter(enumerate(sources))
+    ok = failed = 0
+    try:
+        while True:
+            for index, (filename, load) in queue:
+                pending[asyncio.ensure_future(_parse(mode, filename, load))] = (index, filename)
+                if len(pending) >= BULK_PDF_CONCURRENCY:
+                    break
+            if not pending:
+                break
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index, filename = pending.pop(task)
+                try:
+                    result = task.result()
+                except Exception as e:
+                    error = e.detail if isinstance(e, HTTPException) else str(e) or type(e).__name__
+                    result = {"error": error}
+                # process_gia_pdf reports unreadable PDFs as {"error": ...}
+                if "error" in result and len(result) == 1:
+                    failed += 1
+                    yield _line({"index": index, "filename": filename, "status": "error", "error": result["error"]})
+                else:
+                    ok += 1
+                    yield _line({"index": index, "filename": filename, "status": "ok", "result": result})
+        yield _line({"summary": {"total": len(sources), "ok": ok, "failed": failed}})
+    finally:
+        # client went away: stop waiting on what is still queued
+        for task in pending:
+            task.cancel()
+
+
+@router.post("/bulk")
+async def upload_bulk_pdfs(
+    files: List[UploadFile] = File(...),
+    mode: str = Form("standard"),
+):
+    """
+    Parse many GIA PDFs, sent as PDF files and/or zips of PDFs.
+    mode=standard gives /pdf/upload-pdf/ results, mode=mini gives /pdf/small-reports results.
+    The response is NDJSON: {"index", "filename", "status": "ok", "result"} or
+    {"index", "filename", "status": "error", "error"} per PDF, then {"summary": {...}}.
+    """
+    if mode not in ("standard", "mini"):
+        raise HTTPException(status_code=400, detail="mode must be 'standard' or 'mini'")
+
+    sources = await run_blocking(_pdf_sources, files)
+    if not sources:
+        raise HTTPException(status_code=400, detail="No PDF files found in the upload")
+    if len(sources) > BULK_PDF_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_PDF_MAX_FILES} PDFs per request")
+
+    return StreamingResponse(_iter_results(mode, sources), media_type="application/x-ndjson")
@@ -0,0 +1,190 @@
+"""
+Parse results of GIA PDFs cached by the SHA-256 of the PDF bytes.
+
+An entry is a folder <output dir>/cache/<sha[:2]>/<sha>/ holding the generated
+assets (QR code, barcodes, diagram crops) plus result.json, which is written
+last and marks the entry complete. The folder sits under the same served
+directory as ordinary job output, so the URLs in a cached result keep working.
+Repeat uploads of the same file, including the exact same barcode numbers,
+are answered from the entry; concurrent uploads of one file share one parse.
+"""
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+from executors import PDF_QUEUE_TIMEOUT, pdf_slot, run_blocking, run_in_pdf_pool
+
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_MB", "1024")) * 1024 * 1024
+# Size cap is enforced at most this often (from the API process, after misses).
+PDF_CACHE_SWEEP_SECONDS = int(os.getenv("PDF_CACHE_SWEEP_SECONDS", "60"))
+# An entry without result.json this old belongs to a parse that died.
+PDF_CACHE_STALE_SECONDS = 600
+RESULT_NAME = "result.json"
+MODES = ("standard", "mini")
+
+_inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+_sweep_lock = threading.Lock()
+_last_sweep = 0.0
+
+
+def cache_root(mode: str) -> str:
+    # imported here: the PDF routers import this module
+    if mode == "mini":
+        from pdf.mini_reports import OUTPUT_DIR
+        return os.path.join(OUTPUT_DIR, "cache")
+    from pdf.router import BASE_OUTPUT_DIR, PDF_CACHE_DIRNAME
+    return os.path.join(BASE_OUTPUT_DIR, PDF_CACHE_DIRNAME)
+
+
+def entry_dir(mode: str, digest: str) -> str:
+    return os.path.join(cache_root(mode), digest[:2], digest)
+
+
+def load_cached(mode: str, digest: str) -> Optional[dict]:
+    path = os.path.join(entry_dir(mode, digest), RESULT_NAME)
+    try:
+        with open(path, "r") as f:
+            result = json.load(f)
+        os.utime(path)  # recency for eviction
+        return result
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _parse(mode: str, pdf_bytes: bytes, filename: str, out_dir: Optional[str]) -> dict:
+    if mode == "mini":
+        from pdf.mini_reports import parse_gia_report_from_bytes
+        return parse_gia_report_from_bytes(pdf_bytes, filename, out_dir)
+    from pdf.router import process_gia_pdf
+    return process_gia_pdf(pdf_bytes, out_dir)
+
+
+def parse_and_store(mode: str, pdf_bytes: bytes, filename: str, digest: str) -> dict:
+    """Parse into a new cache entry and commit it. Runs in the PDF process pool."""
+    entry = entry_dir(mode, digest)
+    try:
+        os.makedirs(entry)  # claims the entry
+    except FileExistsError:
+        cached = load_cached(mode, digest)
+        if cached is not None:
+            return cached
+        if time.time() - os.path.getmtime(entry) < PDF_CACHE_STALE_SECONDS:
+            # another API process is filling it right now: parse without caching
+            return _parse(mode, pdf_bytes, filename, None)
+        shutil.rmtree(entry, ignore_errors=True)
+        os.makedirs(entry, exist_ok=True)
+
+    try:
+        result = _parse(mode, pdf_bytes, filename, entry)
+    except Exception:
+        shutil.rmtree(entry, ignore_errors=True)
+        raise
+    if set(result) == {"error"}:
+        # unreadable PDF: nothing worth keeping
+        shutil.rmtree(entry, ignore_errors=True)
+        return result
+
+    tmp = os.path.join(entry, f"{RESULT_NAME}.{uuid.uuid4().hex}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(result, f)
+    os.replace(tmp, os.path.join(entry, RESULT_NAME))
+    return result
+
+
+def evict_entries(max_bytes: int = PDF_CACHE_MAX_BYTES) -> int:
+    """Remove least recently used entries (whole folders) until under 90% of max_bytes."""
+    entries = []
+    total = 0
+    for mode in MODES:
+        root = cache_root(mode)
+        if not os.path.isdir(root):
+            continue
+        for shard in os.scandir(root):
+            if not shard.is_dir(follow_symlinks=False):
+                continue
+            for entry in os.scandir(shard.path):
+                result = os.path.join(entry.path, RESULT_NAME)
+                if not os.path.exists(result):
+                    continue  # still being written
+                size = sum(
+                    os.path.getsize(os.path.join(dirpath, fn))
+                    for dirpath, _, filenames in os.walk(entry.path)
+                    for fn in filenames
+                )
+                entries.append((os.path.getmtime(result), size, entry.path))
+                total += size
+    if total <= max_bytes:
+        return 0
+    entries.sort()
+    removed = 0
+    for _, size, path in entries:
+        if total <= max_bytes * 0.9:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+def _maybe_evict():
+    global _last_sweep
+    now = time.time()
+    with _sweep_lock:
+        if now - _last_sweep < PDF_CACHE_SWEEP_SECONDS:
+            return
+        _last_sweep = now
+    evict_entries()
+
+
+async def _parse_and_store(mode: str, pdf_bytes: bytes, filename: str, digest: str, timeout) -> dict:
+    async with pdf_slot(timeout):
+        result = await run_in_pdf_pool(parse_and_store, mode, pdf_bytes, filename, digest)
+    await run_blocking(_maybe_evict)
+    return result
+
+
+def _forget(key: Tuple[str, str], task: asyncio.Task):
+    if _inflight.get(key) is task:
+        del _inflight[key]
+
+
+async def parse_pdf_cached(
+    mode: str, pdf_bytes: bytes, filename: str = "", timeout: Optional[float] = PDF_QUEUE_TIMEOUT
+) -> dict:
+    """
+    process_gia_pdf (mode="standard") or parse_gia_report_from_bytes (mode="mini")
+    through the cache. `timeout` is the PDF pool admission wait (see executors.pdf_slot),
+    and it applies to this caller even when it joins a parse another request started.
+    """
+    digest = await run_blocking(lambda: hashlib.sha256(pdf_bytes).hexdigest())
+    cached = await run_blocking(load_cached, mode, digest)
+    if cached is not None:
+        return cached
+
+    key = (mode, digest)
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+    while True:
+        task = _inflight.get(key)
+        joined = task is not None
+        if not joined:
+            remaining = None if deadline is None else max(deadline - loop.time(), 0)
+            task = asyncio.ensure_future(_parse_and_store(mode, pdf_bytes, filename, digest, remaining))
+            _inflight[key] = task
+            task.add_done_callback(functools.partial(_forget, key))
+        try:
+            # shielded: one caller disconnecting does not cancel the parse the others wait on
+            return await asyncio.shield(task)
+        except HTTPException as e:
+            # the parse we joined was turned away under its starter's admission wait, not ours
+            if not joined or e.status_code != 503:
+                raise
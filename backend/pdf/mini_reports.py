@@ -10,6 +10,7 @@ import numpy as np
 
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
 from auth.dependencies import get_current_user
+from pdf.cache import parse_pdf_cached
 
 router = APIRouter(
     prefix="/pdf", tags=["PDF Processing"], dependencies=[Depends(get_current_user)]
@@ -53,7 +54,7 @@ async def upload_pdf(files: list[UploadFile] = File(...)):
             )
 
         pdf_bytes = await pdf.read()
-        result = parse_gia_report_from_bytes(pdf_bytes, pdf.filename)
+        result = await parse_pdf_cached("mini", pdf_bytes, pdf.filename)
         results.append(result)
 
     return {"count": len(results), "reports": results}
@@ -62,7 +63,7 @@ async def upload_pdf(files: list[UploadFile] = File(...)):
 # =====================================================
 # SINGLE PDF PARSER (UNCHANGED CORE LOGIC)
 # =====================================================
-def parse_gia_report_from_bytes(pdf_bytes: bytes, filename: str):
+def parse_gia_report_from_bytes(pdf_bytes: bytes, filename: str, report_folder: str = None):
     doc = fitz.open(stream=pdf_bytes, filetype="pdf")
 
     text = ""
@@ -72,7 +73,7 @@ def parse_gia_report_from_bytes(pdf_bytes: bytes, filename: str):
     parsed_data = _parse_text_to_json(text)
     report_number = parsed_data.get("ReportNumber") or os.path.splitext(filename)[0]
 
-    report_folder = os.path.join(OUTPUT_DIR, report_number)
+    report_folder = report_folder or os.path.join(OUTPUT_DIR, report_number)
     os.makedirs(report_folder, exist_ok=True)
 
     proportions_path = _extract_diamond_image_advanced(doc, report_folder)
@@ -245,5 +246,3 @@ def remove_white_background_fast(image_path):
 
     img = Image.fromarray(data, "RGBA")
     img.save(image_path)
-
-
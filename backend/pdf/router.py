@@ -1,10 +1,13 @@
-from fastapi import APIRouter, File, Depends, UploadFile
+from fastapi import APIRouter, File, Depends, HTTPException, UploadFile
 from fastapi.responses import JSONResponse
 import fitz  # PyMuPDF
 import re
 import json
 import os
 import shutil
+import threading
+import time
+import uuid
 import qrcode
 import barcode
 from barcode.writer import ImageWriter
@@ -12,12 +15,23 @@ import random
 from PIL import Image
 import numpy as np
 from auth.dependencies import get_current_user
+from pdf.cache import parse_pdf_cached
 from typing import Optional, List, Tuple
 
 router = APIRouter(prefix="/pdf", tags=["PDF Processing"], dependencies=[Depends(get_current_user)])
 
 BASE_OUTPUT_DIR = os.getenv("OUTPUT_DIR", "output")
 os.makedirs(BASE_OUTPUT_DIR, exist_ok=True)
+# Each upload writes to its own BASE_OUTPUT_DIR/<report_no>_<job id>/ (served under /files),
+# removed once older than this. The sweep runs at most every PDF_JOB_SWEEP_SECONDS.
+PDF_JOB_TTL_HOURS = float(os.getenv("PDF_JOB_TTL_HOURS", "24"))
+PDF_JOB_SWEEP_SECONDS = int(os.getenv("PDF_JOB_SWEEP_SECONDS", "600"))
+FILES_URL_PREFIX = "/files"
+# Parse-result cache (pdf/cache.py) under BASE_OUTPUT_DIR; sized separately, never swept.
+PDF_CACHE_DIRNAME = "cache"
+
+_sweep_lock = threading.Lock()
+_last_sweep = 0.0
 
 RE_DATE = re.compile(r"\b([A-Z][a-z]+ \d{2}, \d{4})\b")
 RE_FIND = {
@@ -33,10 +47,44 @@ RE_FIND = {
 }
 
 def job_dir(report_no: str) -> str:
-    if os.path.exists(BASE_OUTPUT_DIR):
-        shutil.rmtree(BASE_OUTPUT_DIR)
-    os.makedirs(BASE_OUTPUT_DIR, exist_ok=True)
-    return BASE_OUTPUT_DIR
+    """Fresh output folder for one upload, so concurrent jobs never share files."""
+    sweep_expired_jobs()
+    safe_no = re.sub(r"[^A-Za-z0-9]", "", report_no) or "report"
+    path = os.path.join(BASE_OUTPUT_DIR, f"{safe_no}_{uuid.uuid4().hex[:12]}")
+    os.makedirs(path)
+    return path
+
+def sweep_expired_jobs(force: bool = False) -> int:
+    """Delete job folders (and pre-job-folder leftovers) older than PDF_JOB_TTL_HOURS."""
+    global _last_sweep
+    now = time.time()
+    with _sweep_lock:
+        if not force and now - _last_sweep < PDF_JOB_SWEEP_SECONDS:
+            return 0
+        _last_sweep = now
+    cutoff = now - PDF_JOB_TTL_HOURS * 3600
+    removed = 0
+    for entry in os.scandir(BASE_OUTPUT_DIR):
+        if entry.name == PDF_CACHE_DIRNAME:
+            continue
+        try:
+            if entry.stat(follow_symlinks=False).st_mtime > cutoff:
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                os.remove(entry.path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+def output_url(path: Optional[str]) -> Optional[str]:
+    """Public URL of a file written under BASE_OUTPUT_DIR."""
+    if not path:
+        return None
+    rel = os.path.relpath(path, BASE_OUTPUT_DIR).replace("\\", "/")
+    return f"{FILES_URL_PREFIX}/{rel}"
 
 def remove_white_background_fast(image_path: str):
     im = Image.open(image_path).convert("RGBA")
@@ -341,7 +389,7 @@ def extract_comments(text: str):
             comments_lines.append(stripped)
     return " ".join(comments_lines).strip() if comments_lines else None
 
-def process_gia_pdf(pdf_bytes: bytes):
+def process_gia_pdf(pdf_bytes: bytes, out_dir: Optional[str] = None):
     try:
         doc = fitz.open(stream=pdf_bytes, filetype="pdf")
     except Exception as e:
@@ -381,7 +429,7 @@ def process_gia_pdf(pdf_bytes: bytes):
         doc.close()
         return {"error": "Could not find GIA Report Number in the PDF."}
 
-    out_dir = job_dir(gia_report_number)
+    out_dir = out_dir or job_dir(gia_report_number)
     qr_code_path = create_and_save_qr_code(gia_report_number, out_dir)
     barcode12_number, barcode12_path = generate_unique_barcode(12, 1, os.path.join(out_dir, "barcode12"))
     barcode10_number, barcode10_path = generate_unique_barcode(10, 1, os.path.join(out_dir, "barcode10"))
@@ -452,7 +500,18 @@ def process_gia_pdf(pdf_bytes: bytes):
         "QRCODE": qr_code_path.replace("\\", "/") if qr_code_path else None,
         "symbols": symbols,
         "BARCODE12": {"number": barcode12_number, "image": barcode12_path.replace("\\", "/")},
-        "BARCODE10": {"number": barcode10_number, "image": barcode10_path.replace("\\", "/")}
+        "BARCODE10": {"number": barcode10_number, "image": barcode10_path.replace("\\", "/")},
+        "JOB_ID": os.path.basename(out_dir),
+        # where the frontend loads each asset from
+        "URLS": {
+            "PROPORTIONS": output_url(proportions_img),
+            "CLARITYCHARACTERISTICS": output_url(clarity_img),
+            "KEYTOSYMBOLS": output_url(key_to_symbols_img),
+            "NOTES": output_url(notes_img),
+            "QRCODE": output_url(qr_code_path),
+            "BARCODE12": output_url(barcode12_path),
+            "BARCODE10": output_url(barcode10_path),
+        },
     }
 
     json_file_path = os.path.join(out_dir, f"{gia_report_number.strip().replace(' ', '_')}.json")
@@ -465,7 +524,9 @@ def process_gia_pdf(pdf_bytes: bytes):
 async def upload_multi_pdf(file: UploadFile = File(...)):
     try:
         pdf_bytes = await file.read()
-        result = process_gia_pdf(pdf_bytes)
+        result = await parse_pdf_cached("standard", pdf_bytes)
         return JSONResponse(content=result)
+    except HTTPException:
+        raise
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
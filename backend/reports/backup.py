@@ -0,0 +1,283 @@
+import hashlib
+import json
+import os
+import shutil
+import zipfile
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import Report
+
+# Rows fetched per round trip from the server-side cursor while exporting.
+BACKUP_BATCH_SIZE = int(os.getenv("BACKUP_BATCH_SIZE", "500"))
+# Bytes copied per step when streaming a file into the archive.
+BACKUP_CHUNK_SIZE = int(os.getenv("BACKUP_CHUNK_SIZE", str(1024 * 1024)))
+# Rows per INSERT ... ON CONFLICT statement (and per commit) while restoring.
+BACKUP_IMPORT_CHUNK_SIZE = int(os.getenv("BACKUP_IMPORT_CHUNK_SIZE", "1000"))
+# Largest zip accepted by import-backup / upload-pdf-zip.
+ZIP_UPLOAD_MAX_BYTES = int(os.getenv("ZIP_UPLOAD_MAX_MB", "4096")) * 1024 * 1024
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_FORMAT = 1
+
+BACKUP_COLUMNS: List[str] = [
+    "report_no",
+    "description",
+    "shape_and_cut",
+    "tot_est_weight",
+    "color",
+    "clarity",
+    "style_number",
+    "image_filename",
+    "comment",
+    "isecopy",
+    "notice_image",
+    "igi_logo",
+    "company_logo",
+    "created_at",
+]
+
+
+def report_backup_row(r: Report) -> list:
+    """One reports.xlsx row, in BACKUP_COLUMNS order."""
+    return [
+        r.report_no,
+        r.description,
+        r.shape_and_cut,
+        r.tot_est_weight,
+        r.color,
+        r.clarity,
+        r.style_number,
+        r.image_filename,
+        r.comment,
+        bool(r.isecopy),
+        bool(r.notice_image),
+        bool(getattr(r, "igi_logo", False)),
+        r.company_logo,
+        r.created_at.isoformat() if r.created_at else None,
+    ]
+
+
+class ZipChunkSink:
+    """
+    Write-only, non-seekable target for zipfile.ZipFile.
+
+    zipfile falls back to data descriptors when it cannot seek, so the
+    archive can be produced front to back and handed out in pieces with
+    drain() instead of being assembled in memory first.
+    """
+
+    def __init__(self):
+        self._buf = bytearray()
+
+    def write(self, data) -> int:
+        self._buf += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = bytes(self._buf)
+        self._buf.clear()
+        return data
+
+
+def spooled_size(fileobj) -> int:
+    """Size of an uploaded (spooled) file without reading it into memory."""
+    pos = fileobj.tell()
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(pos)
+    return size
+
+
+def extract_zip_member(zf: zipfile.ZipFile, member: str, dest_path: str):
+    """Copy one archive member to dest_path through a bounded buffer."""
+    with zf.open(member) as src, open(dest_path, "wb") as dst:
+        shutil.copyfileobj(src, dst, BACKUP_CHUNK_SIZE)
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(BACKUP_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def stream_file_into_zip(
+    zf: zipfile.ZipFile,
+    sink: ZipChunkSink,
+    src_path: str,
+    arcname: str,
+    hasher=None,
+) -> Iterator[bytes]:
+    """
+    Copy src_path into the archive, yielding compressed output as it is produced.
+    If a hashlib object is passed it is fed the uncompressed bytes on the way.
+    """
+    zinfo = zipfile.ZipInfo.from_file(src_path, arcname)
+    zinfo.compress_type = zipfile.ZIP_DEFLATED
+    with open(src_path, "rb") as src, zf.open(zinfo, "w") as dst:
+        while True:
+            chunk = src.read(BACKUP_CHUNK_SIZE)
+            if not chunk:
+                break
+            if hasher is not None:
+                hasher.update(chunk)
+            dst.write(chunk)
+            data = sink.drain()
+            if data:
+                yield data
+    data = sink.drain()
+    if data:
+        yield data
+
+
+# ==========================================================
+# Manifest (incremental backups)
+# ==========================================================
+def build_manifest(
+    generated_at: datetime,
+    since: Optional[datetime],
+    files: Dict[str, str],
+    reports: int,
+    links: Optional[Dict[str, str]] = None,
+) -> bytes:
+    """
+    manifest.json written into every backup.
+
+    files maps archive names (images/..., logo/...) to sha256 for everything
+    the backup chain holds so far, not only what this archive carries, so
+    the manifest of the latest backup is enough to produce the next delta.
+    links maps names whose content this archive stores only once to the
+    member that holds it.
+    """
+    manifest = {
+        "format": MANIFEST_FORMAT,
+        "kind": "incremental" if since else "full",
+        "generated_at": generated_at.isoformat(),
+        "since": since.isoformat() if since else None,
+        "reports": reports,
+        "files": files,
+        "links": links or {},
+    }
+    return json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8")
+
+
+def parse_manifest(raw: bytes) -> dict:
+    """Parse and sanity-check a manifest; raises ValueError when it is not usable."""
+    try:
+        manifest = json.loads(raw)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid manifest: {e}")
+    if not isinstance(manifest, dict) or manifest.get("format") != MANIFEST_FORMAT:
+        raise ValueError("Unsupported manifest format")
+    try:
+        manifest["generated_at"] = datetime.fromisoformat(manifest["generated_at"])
+        if manifest.get("since"):
+            manifest["since"] = datetime.fromisoformat(manifest["since"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Manifest has no valid generated_at/since")
+    if not isinstance(manifest.get("files"), dict):
+        manifest["files"] = {}
+    if not isinstance(manifest.get("links"), dict):
+        manifest["links"] = {}
+    return manifest
+
+
+def read_zip_manifest(zf: zipfile.ZipFile) -> Optional[dict]:
+    """Manifest of a backup archive, or None for archives made before manifests existed."""
+    if MANIFEST_NAME not in zf.namelist():
+        return None
+    return parse_manifest(zf.read(MANIFEST_NAME))
+
+
+# ==========================================================
+# Bulk restore
+# ==========================================================
+RESTORE_STR_COLUMNS = [
+    "report_no",
+    "description",
+    "shape_and_cut",
+    "tot_est_weight",
+    "color",
+    "clarity",
+    "style_number",
+    "comment",
+    "image_filename",
+    "company_logo",
+]
+RESTORE_BOOL_COLUMNS = ["isecopy", "notice_image", "igi_logo"]
+_TRUE_STRINGS = ["true", "1", "yes", "y", "t"]
+
+
+def coerce_str_column(col: pd.Series) -> pd.Series:
+    """Column-wise str(val).strip(), None where the cell is empty."""
+    present = col.notna()
+    out = pd.Series([None] * len(col), index=col.index, dtype=object)
+    out[present] = col[present].astype(str).str.strip().astype(object)
+    return out
+
+
+def coerce_bool_column(col: pd.Series) -> pd.Series:
+    """Column-wise truthiness as written by export-backup (bools or yes/no strings)."""
+    return col.notna() & col.astype(str).str.strip().str.lower().isin(_TRUE_STRINGS)
+
+
+def restore_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """reports.xlsx frame -> one column per Report field, already coerced."""
+    out = pd.DataFrame(index=df.index)
+    for c in RESTORE_STR_COLUMNS:
+        out[c] = coerce_str_column(df[c]) if c in df.columns else None
+    for c in RESTORE_BOOL_COLUMNS:
+        out[c] = coerce_bool_column(df[c])
+    return out
+
+
+def _insert_for(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Bulk restore does not support the {dialect} dialect")
+    return insert
+
+
+def upsert_reports(db: Session, rows: List[dict], overwrite: bool):
+    """
+    Write one chunk of restored rows with a single INSERT ... ON CONFLICT
+    (report_no) and commit it. Returns (imported, updated, skipped_report_nos).
+    """
+    if not rows:
+        return 0, 0, []
+    insert = _insert_for(db)
+
+    report_nos = [r["report_no"] for r in rows]
+    existing = {
+        no for (no,) in db.query(Report.report_no).filter(Report.report_no.in_(report_nos))
+    }
+
+    if overwrite:
+        stmt = insert(Report).values(rows)
+        update_cols = {c: stmt.excluded[c] for c in rows[0] if c != "report_no"}
+        # ON CONFLICT DO UPDATE bypasses the ORM onupdate hook
+        update_cols["updated_at"] = func.now()
+        stmt = stmt.on_conflict_do_update(index_elements=[Report.report_no], set_=update_cols)
+        db.execute(stmt)
+        db.commit()
+        return len(rows) - len(existing), len(existing), []
+
+    new_rows = [r for r in rows if r["report_no"] not in existing]
+    if new_rows:
+        stmt = insert(Report).values(new_rows).on_conflict_do_nothing(index_elements=[Report.report_no])
+        db.execute(stmt)
+    db.commit()
+    return len(new_rows), 0, [no for no in report_nos if no in existing]
@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional, Tuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from database import engine
+from models import CacheVersion
+
+# Resolved GET /public/reports/{report_no} responses (one per QR scan).
+PUBLIC_REPORT_CACHE_SIZE = int(os.getenv("PUBLIC_REPORT_CACHE_SIZE", "10000"))
+PUBLIC_REPORT_CACHE_TTL = float(os.getenv("PUBLIC_REPORT_CACHE_TTL", "300"))
+# 404s are kept much shorter so a report that was just created shows up quickly.
+PUBLIC_REPORT_NEGATIVE_TTL = float(os.getenv("PUBLIC_REPORT_NEGATIVE_TTL", "15"))
+
+
+def read_cache_version(name: str) -> int:
+    with engine.connect() as conn:
+        version = conn.execute(
+            select(CacheVersion.version).where(CacheVersion.name == name)
+        ).scalar()
+    return version or 0
+
+
+def bump_cache_version(name: str):
+    """Make every worker's cached entries for `name` stale; call after the change is committed."""
+    with engine.begin() as conn:
+        bumped = conn.execute(
+            update(CacheVersion).where(CacheVersion.name == name).values(version=CacheVersion.version + 1)
+        ).rowcount
+        if not bumped:
+            try:
+                with conn.begin_nested():
+                    conn.execute(insert(CacheVersion).values(name=name, version=1))
+            except IntegrityError:
+                # another worker created the row first
+                conn.execute(
+                    update(CacheVersion).where(CacheVersion.name == name).values(version=CacheVersion.version + 1)
+                )
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire after a TTL.
+
+    Writers call invalidate()/clear() after committing. Readers take
+    generation() before loading a value and pass it to get() and set(); a
+    value loaded while an invalidation happened is dropped instead of cached,
+    so an in-flight read can never put stale data back.
+
+    With a `shared` name the cache also follows a version kept in the
+    database (cache_versions): an invalidation in any API worker bumps it,
+    and entries cached under an older version are misses everywhere. That
+    costs one primary-key read per generation().
+    """
+
+    def __init__(self, maxsize: int, ttl: float, shared: Optional[str] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.shared = shared
+        self._data: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def generation(self) -> Tuple[int, int]:
+        """(local generation, shared version) as of now."""
+        shared = read_cache_version(self.shared) if self.shared else 0
+        with self._lock:
+            return self._generation, shared
+
+    def get(self, key: Hashable, generation: Optional[Tuple[int, int]] = None) -> Tuple[bool, Any]:
+        """(hit, value); value may legitimately be None (a cached negative)."""
+        generation = self.generation() if generation is None else generation
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            expires, version, value = entry
+            if expires <= time.monotonic() or version != generation[1]:
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key: Hashable, value: Any, generation: Tuple[int, int], ttl: Optional[float] = None):
+        with self._lock:
+            if generation[0] != self._generation:
+                return
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), generation[1], value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, keys: Iterable[Hashable]):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._data.pop(key, None)
+        if self.shared:
+            bump_cache_version(self.shared)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+        if self.shared:
+            bump_cache_version(self.shared)
+
+
+public_report_cache = TTLCache(PUBLIC_REPORT_CACHE_SIZE, PUBLIC_REPORT_CACHE_TTL, shared="public_report")
+
+
+def invalidate_public_reports(report_nos: Iterable[str]):
+    """Drop cached public lookups for these reports in every worker; call after the change is committed."""
+    public_report_cache.invalidate(report_nos)
@@ -0,0 +1,146 @@
+import hashlib
+import os
+import threading
+import uuid
+from collections import deque
+from types import SimpleNamespace
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from utils import CARD_FIELDS, CARD_TEMPLATE_VERSION, compose_card_image, report_qr_url
+from reports.images import IMAGE_ENCODE_WORKERS, get_encode_pool
+from reports.storage import UPLOAD_DIR, resolve_upload, trim_lru
+
+# Rendered report cards, keyed by a hash of everything drawn on them, so an
+# edited report simply gets a new key and stale cards age out of the cache.
+CARD_CACHE_DIR = os.path.join(UPLOAD_DIR, "cards")
+CARD_CACHE_MAX_BYTES = int(os.getenv("CARD_CACHE_MAX_MB", "512")) * 1024 * 1024
+# Batch exports keep at most this many renders queued or finished-but-unsent,
+# which bounds the card bytes held in memory.
+CARD_EXPORT_MAX_IN_FLIGHT = int(os.getenv("CARD_EXPORT_MAX_IN_FLIGHT", str(IMAGE_ENCODE_WORKERS * 2)))
+
+_locks = [threading.Lock() for _ in range(16)]
+_size_lock = threading.Lock()
+_written_since_check = CARD_CACHE_MAX_BYTES  # forces a scan on first write
+
+
+def _image_source(report) -> Optional[str]:
+    if not report.image_filename:
+        return None
+    path = resolve_upload(report.image_filename)
+    return path if os.path.exists(path) else None
+
+
+def card_values(report) -> Dict[str, Optional[str]]:
+    """Everything drawn on a card, as plain data that can be sent to a worker process."""
+    values = {attr: getattr(report, attr, None) for _, attr in CARD_FIELDS}
+    values["qr_url"] = report_qr_url(report)
+    values["image_filename"] = report.image_filename
+    return values
+
+
+def compose_card(values: Dict[str, Optional[str]]) -> bytes:
+    """Render a card from card_values(). Module level so it can run in the process pool."""
+    report = SimpleNamespace(**values)
+    # drawn from the original upload, as the card always was (a variant would
+    # decode faster but changes the pixels)
+    return compose_card_image(report, _image_source(report))
+
+
+def card_key(report) -> str:
+    """sha256 of the card's content: template version, field values, QR URL and image."""
+    h = hashlib.sha256(f"v{CARD_TEMPLATE_VERSION}".encode())
+    for _, attr in CARD_FIELDS:
+        h.update(b"\0" + str(getattr(report, attr, None) or "").encode("utf-8"))
+    h.update(b"\0" + report_qr_url(report).encode("utf-8"))
+    source = _image_source(report)
+    if source:
+        # uploads are links into the content-addressed store: the inode identifies the content
+        st = os.stat(source)
+        h.update(f"\0{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}".encode())
+    return h.hexdigest()
+
+
+def card_path(key: str) -> str:
+    return os.path.join(CARD_CACHE_DIR, key[:2], f"{key}.png")
+
+
+def render_card(report, key: Optional[str] = None) -> Tuple[str, str]:
+    """(key, path) of the report's card PNG, rendering it only if not cached."""
+    key = key or card_key(report)
+    path = card_path(key)
+    with _locks[int(key[:4], 16) % len(_locks)]:
+        try:
+            os.utime(path)  # recency for LRU eviction
+            return key, path
+        except FileNotFoundError:
+            pass
+        _store_card(path, compose_card(card_values(report)))
+    return key, path
+
+
+def _store_card(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    _account(len(data))
+
+
+def iter_rendered_cards(
+    reports: Iterable, max_in_flight: int = CARD_EXPORT_MAX_IN_FLIGHT
+) -> Iterator[Tuple[str, Optional[bytes], Optional[str]]]:
+    """
+    (report_no, png, error) for each report, in order. Cached cards are read
+    from disk; the rest render in the shared process pool (reports/images.py)
+    while earlier ones are being consumed. At most `max_in_flight` renders are
+    outstanding or waiting to be consumed.
+    """
+    pool = get_encode_pool()
+    window = deque()
+
+    def finish(report, path, fut):
+        try:
+            if fut is None:
+                try:
+                    with open(path, "rb") as f:
+                        return report.report_no, f.read(), None
+                except FileNotFoundError:
+                    # trimmed between queueing and now: render it after all
+                    data = compose_card(card_values(report))
+            else:
+                data = fut.result()
+            _store_card(path, data)
+            return report.report_no, data, None
+        except Exception as e:
+            return report.report_no, None, str(e)
+
+    for report in reports:
+        key = card_key(report)
+        path = card_path(key)
+        try:
+            os.utime(path)
+            fut = None
+        except FileNotFoundError:
+            fut = pool.submit(compose_card, card_values(report))
+        window.append((report, path, fut))
+        if len(window) >= max_in_flight:
+            yield finish(*window.popleft())
+
+    while window:
+        yield finish(*window.popleft())
+
+
+def _account(written: int):
+    global _written_since_check
+    with _size_lock:
+        _written_since_check += written
+        due = _written_since_check >= CARD_CACHE_MAX_BYTES // 20
+        if due:
+            _written_since_check = 0
+    if due:
+        enforce_card_cache_limit()
+
+
+def enforce_card_cache_limit(max_bytes: int = CARD_CACHE_MAX_BYTES) -> int:
+    return trim_lru(CARD_CACHE_DIR, max_bytes)
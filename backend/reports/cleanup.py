@@ -0,0 +1,80 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from models import Report
+from reports.storage import existing_upload_paths
+
+# Unlinks that fail (e.g. file briefly locked) are retried with a growing delay.
+FILE_CLEANUP_ATTEMPTS = int(os.getenv("FILE_CLEANUP_ATTEMPTS", "5"))
+FILE_CLEANUP_RETRY_DELAY = float(os.getenv("FILE_CLEANUP_RETRY_DELAY", "2"))
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="file-cleanup")
+
+
+def _identity(st: os.stat_result) -> Tuple[int, int, int]:
+    # ctime moves whenever the name is (re)stored: store_file links a fresh name even for known content
+    return st.st_dev, st.st_ino, st.st_ctime_ns
+
+
+def _unlink(path: str, identity: Tuple[int, int, int], attempt: int):
+    try:
+        if _identity(os.stat(path)) != identity:
+            # written again since it was orphaned (re-ingest, restore): the new file is not ours.
+            # If it is unused after all, GC (reports/gc.py) collects it.
+            return
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        if attempt >= FILE_CLEANUP_ATTEMPTS:
+            print(f"⚠️ Giving up on removing {path}: {e}")
+            return
+        delay = FILE_CLEANUP_RETRY_DELAY * 2 ** (attempt - 1)
+        timer = threading.Timer(delay, lambda: _executor.submit(_unlink, path, identity, attempt + 1))
+        timer.daemon = True
+        timer.start()
+
+
+def schedule_file_removal(paths: Iterable[str]):
+    """
+    Unlink files off the request path. Only call once the DB change that orphaned them is committed.
+    Each file is identified as it is now; if its name is stored again before the unlink runs, it is kept.
+    """
+    for path in paths:
+        try:
+            identity = _identity(os.stat(path))
+        except FileNotFoundError:
+            continue
+        _executor.submit(_unlink, path, identity, 1)
+
+
+def unreferenced_files(
+    db: Session,
+    image_filenames: Iterable[Optional[str]],
+    company_logos: Iterable[Optional[str]],
+) -> List[str]:
+    """
+    Paths of the given images/logos that no remaining report points at.
+    Company logos are shared by every report of an upload, so they must
+    outlive the reports being deleted.
+    """
+    images: Set[str] = {f for f in image_filenames if f}
+    logos: Set[str] = {f for f in company_logos if f}
+
+    if images:
+        images -= {
+            f for (f,) in db.query(Report.image_filename).filter(Report.image_filename.in_(images)).distinct()
+        }
+    if logos:
+        logos -= {
+            f for (f,) in db.query(Report.company_logo).filter(Report.company_logo.in_(logos)).distinct()
+        }
+
+    return (
+        [p for f in sorted(images) for p in existing_upload_paths(f)]
+        + [p for f in sorted(logos) for p in existing_upload_paths(f, "logo")]
+    )
@@ -0,0 +1,79 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, NamedTuple, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+# Public reports are immutable until edited; shared caches may keep them briefly
+# and must revalidate (cheap 304) after that.
+PUBLIC_REPORT_MAX_AGE = int(os.getenv("PUBLIC_REPORT_MAX_AGE", "60"))
+PUBLIC_REPORT_CACHE_CONTROL = (
+    f"public, max-age={PUBLIC_REPORT_MAX_AGE}, stale-while-revalidate={PUBLIC_REPORT_MAX_AGE}"
+)
+# Admin listings are per-user: browsers may store them but must revalidate every time.
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+
+class PreparedJSON(NamedTuple):
+    """A serialized JSON body with its validators, ready to be (re)served."""
+    body: bytes
+    etag: str
+    last_modified: Optional[datetime]
+
+
+def prepare_json(content: Any, last_modified: Optional[datetime] = None) -> PreparedJSON:
+    """Serialize once, exactly as JSONResponse would, and derive a strong ETag from the bytes."""
+    body = JSONResponse(jsonable_encoder(content)).body
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    if last_modified is not None and last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return PreparedJSON(body, etag, last_modified)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison: W/"x" matches "x"
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # HTTP dates have whole-second precision
+    return last_modified.replace(microsecond=0) <= since
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        return _not_modified_since(if_modified_since, last_modified)
+    return False
+
+
+def conditional_json(request: Request, prepared: PreparedJSON, cache_control: str) -> Response:
+    """200 with the prepared body, or a bodyless 304 when the client's copy is current."""
+    headers = {"ETag": prepared.etag, "Cache-Control": cache_control}
+    if prepared.last_modified is not None:
+        headers["Last-Modified"] = format_datetime(prepared.last_modified.astimezone(timezone.utc), usegmt=True)
+    if is_not_modified(request, prepared.etag, prepared.last_modified):
+        return Response(status_code=304, headers=headers)
+    return Response(content=prepared.body, media_type="application/json", headers=headers)
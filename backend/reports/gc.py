@@ -0,0 +1,256 @@
+"""
+Garbage collection of upload files no database row points to.
+
+Orphans come from failed ingests, replaced images/logos and overwritten
+backup restores. A run diffs UPLOAD_DIR, UPLOAD_DIR/logo and
+UPLOAD_DIR/pdfs against Report.image_filename, Report.company_logo and
+UploadedPDF.filename, moves the orphans into a dated quarantine folder,
+purges quarantine folders older than the retention period and prunes
+blobs (reports/storage.py) that no upload name links to any more.
+Rendered image variants (reports/variants.py) of images no report uses
+are dropped, the variant and card (reports/cards.py) caches are trimmed
+to their size caps, and upload-xlsx workbooks no pending job needs
+(reports/jobs.py) are deleted.
+
+    python -m reports.gc --dry-run     # list what would be quarantined
+    python -m reports.gc               # quarantine orphans, purge old quarantine
+    python -m reports.gc --purge-now   # ... and empty the quarantine right away
+    python -m reports.gc --adopt-existing  # also move pre-blob-store files into the store
+
+The scheduler thread (start_gc_scheduler) runs the same thing every
+GC_INTERVAL_HOURS from the API process.
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+from database import SessionLocal
+from models import Report, UploadedPDF
+from reports.ingest import UPLOAD_DIR
+from reports.jobs import stale_workbooks
+from reports.storage import adopt_file, iter_upload_files, prune_blobs
+from reports.cards import enforce_card_cache_limit
+from reports.variants import VARIANT_DIR, enforce_variant_cache_limit
+
+# Files younger than this are never touched: an ingest writes its images before the rows commit.
+GC_MIN_AGE_SECONDS = int(os.getenv("GC_MIN_AGE_SECONDS", str(6 * 3600)))
+# Quarantined files are kept this long before being purged (so a bad run can be undone).
+GC_QUARANTINE_DAYS = float(os.getenv("GC_QUARANTINE_DAYS", "7"))
+# Scheduled runs from the API process; 0 disables.
+GC_INTERVAL_HOURS = float(os.getenv("GC_INTERVAL_HOURS", "24"))
+GC_BATCH_SIZE = int(os.getenv("GC_BATCH_SIZE", "5000"))
+
+QUARANTINE_DIR = os.path.join(UPLOAD_DIR, ".quarantine")
+_STAMP_FORMAT = "%Y%m%dT%H%M%SZ"
+
+# (folder relative to UPLOAD_DIR, referenced-set key); only upload files are scanned
+# (flat and sharded, see reports/storage.py), so blobs/ and .quarantine/ are never collected
+# (jobs/ is handled separately, see stale_workbooks)
+SCANNED_DIRS = (("", "images"), ("logo", "logos"), ("pdfs", "pdfs"))
+
+_lock = threading.Lock()
+
+
+def referenced_files(db) -> Dict[str, Set[str]]:
+    """Every file name the database points to, per upload folder."""
+    refs: Dict[str, Set[str]] = {"images": set(), "logos": set(), "pdfs": set()}
+    columns = (
+        (Report.image_filename, "images"),
+        (Report.company_logo, "logos"),
+        (UploadedPDF.filename, "pdfs"),
+    )
+    for column, key in columns:
+        rows = db.query(column).filter(column.isnot(None)).distinct().yield_per(GC_BATCH_SIZE)
+        refs[key].update(name for (name,) in rows)
+    return refs
+
+
+def _candidates(min_age: float) -> Iterator[Tuple[str, str, str, int]]:
+    """(relative path, set key, file name, size) for files old enough to collect."""
+    cutoff = time.time() - min_age
+    for folder, key in SCANNED_DIRS:
+        for entry in iter_upload_files(folder):
+            st = entry.stat(follow_symlinks=False)
+            # not mtime: a new name linked to an old blob keeps the blob's mtime, but link/rename bump ctime
+            if st.st_ctime > cutoff:
+                continue
+            yield os.path.relpath(entry.path, UPLOAD_DIR), key, entry.name, st.st_size
+
+
+def find_orphans(
+    db, min_age: float = GC_MIN_AGE_SECONDS, refs: Optional[Dict[str, Set[str]]] = None
+) -> Dict[str, int]:
+    """Orphaned files (path relative to UPLOAD_DIR -> size in bytes)."""
+    refs = referenced_files(db) if refs is None else refs
+    return {
+        rel_path: size
+        for rel_path, key, name, size in _candidates(min_age)
+        if name not in refs[key]
+    }
+
+
+def orphan_variant_dirs(refs: Dict[str, Set[str]], min_age: float) -> Iterator[str]:
+    """Variant folders (VARIANT_DIR/<shard>/<name>) of images no report points to."""
+    cutoff = time.time() - min_age
+    if not os.path.isdir(VARIANT_DIR):
+        return
+    for level1 in os.scandir(VARIANT_DIR):
+        if not level1.is_dir(follow_symlinks=False):
+            continue
+        for level2 in os.scandir(level1.path):
+            if not level2.is_dir(follow_symlinks=False):
+                continue
+            for entry in os.scandir(level2.path):
+                if (
+                    entry.is_dir(follow_symlinks=False)
+                    and entry.name not in refs["images"]
+                    and entry.stat(follow_symlinks=False).st_mtime <= cutoff
+                ):
+                    yield entry.path
+
+
+def quarantine(orphans: Dict[str, int], now: datetime) -> int:
+    """Move orphans into QUARANTINE_DIR/<timestamp>/, keeping their relative paths."""
+    batch_dir = os.path.join(QUARANTINE_DIR, now.strftime(_STAMP_FORMAT))
+    moved = 0
+    for rel_path in orphans:
+        dest = os.path.join(batch_dir, rel_path)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        try:
+            os.replace(os.path.join(UPLOAD_DIR, rel_path), dest)
+            moved += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"⚠️ GC could not quarantine {rel_path}: {e}")
+    return moved
+
+
+def purge_quarantine(now: datetime, older_than_days: float = GC_QUARANTINE_DAYS) -> int:
+    """Delete quarantine folders older than the retention period; returns how many were removed."""
+    if not os.path.isdir(QUARANTINE_DIR):
+        return 0
+    cutoff = now - timedelta(days=older_than_days)
+    purged = 0
+    for name in os.listdir(QUARANTINE_DIR):
+        try:
+            stamp = datetime.strptime(name, _STAMP_FORMAT).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+        if stamp <= cutoff:
+            shutil.rmtree(os.path.join(QUARANTINE_DIR, name), ignore_errors=True)
+            purged += 1
+    return purged
+
+
+def collect_garbage(
+    dry_run: bool = False,
+    min_age: float = GC_MIN_AGE_SECONDS,
+    purge_after_days: float = GC_QUARANTINE_DAYS,
+) -> dict:
+    """One GC pass. With dry_run nothing is moved or deleted; the report says what would be."""
+    now = datetime.now(timezone.utc)
+    with _lock:
+        db = SessionLocal()
+        try:
+            refs = referenced_files(db)
+            orphans = find_orphans(db, min_age, refs)
+            workbooks = stale_workbooks(db, min_age)
+        finally:
+            db.close()
+
+        stale_variants = list(orphan_variant_dirs(refs, min_age))
+        quarantined = purged = evicted = 0
+        if not dry_run:
+            quarantined = quarantine(orphans, now)
+            purged = purge_quarantine(now, purge_after_days)
+            # variants are derived data: no quarantine, they can always be rendered again
+            for path in stale_variants:
+                shutil.rmtree(path, ignore_errors=True)
+            # inputs of finished, failed or never-committed upload-xlsx jobs
+            for path in workbooks:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            evicted = enforce_variant_cache_limit() + enforce_card_cache_limit()
+        # blobs whose last name is gone (deleted reports, purged quarantine)
+        pruned = prune_blobs(min_age, dry_run=dry_run)
+
+    return {
+        "dry_run": dry_run,
+        "orphans": sorted(orphans),
+        "orphan_count": len(orphans),
+        "orphan_bytes": sum(orphans.values()),
+        "quarantined": quarantined,
+        "purged_batches": purged,
+        "pruned_blobs": pruned,
+        "stale_variant_dirs": len(stale_variants),
+        "stale_workbooks": len(workbooks),
+        "evicted_cache_files": evicted,
+    }
+
+
+def adopt_existing() -> int:
+    """Move upload files that predate the blob store into it (dedupes them); returns how many."""
+    adopted = 0
+    for rel_path, _, _, _ in _candidates(0):
+        try:
+            adopted += adopt_file(os.path.join(UPLOAD_DIR, rel_path))
+        except OSError as e:
+            print(f"⚠️ Could not adopt {rel_path}: {e}")
+    return adopted
+
+
+def _scheduled_loop(interval_hours: float):
+    while True:
+        time.sleep(interval_hours * 3600)
+        try:
+            result = collect_garbage()
+            print(
+                f"🧹 Upload GC: {result['quarantined']} files quarantined "
+                f"({result['orphan_bytes']} bytes), {result['purged_batches']} old batches purged"
+            )
+        except Exception:
+            print("❌ Upload GC failed:")
+            traceback.print_exc()
+
+
+def start_gc_scheduler(interval_hours: Optional[float] = None):
+    interval_hours = GC_INTERVAL_HOURS if interval_hours is None else interval_hours
+    if interval_hours <= 0:
+        return
+    threading.Thread(target=_scheduled_loop, args=(interval_hours,), name="upload-gc", daemon=True).start()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m reports.gc", description="Collect orphaned upload files.")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be quarantined")
+    parser.add_argument("--min-age", type=float, default=GC_MIN_AGE_SECONDS,
+                        help="skip files modified in the last N seconds (default %(default)s)")
+    parser.add_argument("--purge-after", type=float, default=GC_QUARANTINE_DAYS,
+                        help="purge quarantine batches older than N days (default %(default)s)")
+    parser.add_argument("--purge-now", action="store_true", help="purge the whole quarantine after this run")
+    parser.add_argument("--adopt-existing", action="store_true",
+                        help="first move files written before the blob store into it")
+    args = parser.parse_args(argv)
+
+    if args.adopt_existing and not args.dry_run:
+        print(f"📦 Adopted {adopt_existing()} files into the blob store")
+
+    result = collect_garbage(
+        dry_run=args.dry_run,
+        min_age=args.min_age,
+        purge_after_days=0 if args.purge_now else args.purge_after,
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import io
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Optional
+
+from PIL import Image
+
+from reports.storage import new_temp_path, store_file
+from reports.variants import render_variants
+
+# Encoder settings for product images saved during spreadsheet ingest.
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "png").lower()  # png | webp
+IMAGE_COMPRESS_LEVEL = int(os.getenv("IMAGE_COMPRESS_LEVEL", "6"))  # png: zlib 0-9
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "90"))  # webp: 0-100
+IMAGE_OPTIMIZE = os.getenv("IMAGE_OPTIMIZE", "true").lower() in ("1", "true", "yes")
+IMAGE_ENCODE_WORKERS = int(os.getenv("IMAGE_ENCODE_WORKERS", str(os.cpu_count() or 2)))
+# Also write the thumb/card/full variants (reports/variants.py) while the image is decoded.
+IMAGE_VARIANTS_EAGER = os.getenv("IMAGE_VARIANTS_EAGER", "true").lower() in ("1", "true", "yes")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def image_extension() -> str:
+    return ".webp" if IMAGE_FORMAT == "webp" else ".png"
+
+
+def encoder_settings() -> Dict[str, object]:
+    """Settings handed to the worker, so children use the parent's configuration."""
+    if IMAGE_FORMAT == "webp":
+        return {"format": "WEBP", "quality": IMAGE_QUALITY, "method": 6 if IMAGE_OPTIMIZE else 4}
+    return {"format": "PNG", "compress_level": IMAGE_COMPRESS_LEVEL, "optimize": IMAGE_OPTIMIZE}
+
+
+def encode_image(data, dest_path: str, settings: Dict[str, object]) -> str:
+    """
+    Decode an embedded sheet image (raw bytes or a PIL image) and save it to
+    dest_path through the blob store. Runs inside the encode pool.
+    """
+    img = Image.open(io.BytesIO(data)) if isinstance(data, (bytes, bytearray)) else data
+    tmp_path = new_temp_path()
+    try:
+        img.convert("RGBA").save(tmp_path, **settings)
+    except Exception:
+        img.save(tmp_path, format=settings["format"])
+    # identical photos end up as links to one stored blob
+    store_file(tmp_path, dest_path)
+    if IMAGE_VARIANTS_EAGER:
+        try:
+            render_variants(img, os.path.basename(dest_path))
+        except Exception as e:
+            # variants are rendered on demand later; the image itself is saved
+            print(f"⚠️ Could not render variants of {dest_path}: {e}")
+    return dest_path
+
+
+def get_encode_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=IMAGE_ENCODE_WORKERS)
+        return _pool
+
+
+class ImageEncodeQueue:
+    """
+    Feeds encode jobs to the shared process pool while the caller keeps
+    transforming rows. At most `max_in_flight` jobs are outstanding, which
+    also caps the image bytes held in memory.
+    """
+
+    def __init__(self, max_in_flight: Optional[int] = None):
+        self._pool = get_encode_pool()
+        self._max_in_flight = max_in_flight or IMAGE_ENCODE_WORKERS * 2
+        self._futures = {}
+
+    def submit(self, key: str, data, dest_path: str):
+        running = [f for f in self._futures.values() if not f.done()]
+        if len(running) >= self._max_in_flight:
+            wait(running, return_when=FIRST_COMPLETED)
+        self._futures[key] = self._pool.submit(encode_image, data, dest_path, encoder_settings())
+
+    def result(self, key: str) -> bool:
+        """Block until the image for `key` is written; False if it failed or was never submitted."""
+        fut = self._futures.pop(key, None)
+        if fut is None:
+            return False
+        try:
+            fut.result()
+            return True
+        except Exception as e:
+            print(f"⚠️ Image encode failed for {key}: {e}")
+            return False
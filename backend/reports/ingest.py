@@ -0,0 +1,463 @@
+import os
+from collections import defaultdict
+from functools import lru_cache
+from typing import BinaryIO, Callable, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+from num2words import num2words
+from openpyxl import load_workbook
+from sqlalchemy.orm import Session
+
+from models import Report
+from schemas import ReportOut
+from utils import gen_report_no
+from reports.backup import coerce_str_column
+from reports.cache import invalidate_public_reports
+from reports.images import IMAGE_VARIANTS_EAGER, ImageEncodeQueue, image_extension
+from reports.storage import existing_upload_paths, upload_path
+from reports.variants import enforce_variant_cache_limit
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./uploads")
+
+# Reports inserted per transaction by upload-xlsx.
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "200"))
+# Values per IN (...) list for set-based lookups.
+LOOKUP_CHUNK_SIZE = 1000
+
+EARRING_ALIASES = ["earring", "ear rings", "ear-ring", "ear-rings"]
+IGI_LOGO_COLUMNS = ["igi_logo", "igi logo", "igi-logo"]
+
+
+def index_sheet_images(sheet) -> Dict[int, list]:
+    """
+    Map each Excel row (1-based) to the images anchored on it, in sheet order.
+    Built in one pass when the workbook is loaded so row lookups are O(1).
+    """
+    images_by_row = defaultdict(list)
+    for img in getattr(sheet, "_images", []):
+        try:
+            anchor = img.anchor._from
+            images_by_row[anchor.row + 1].append(img)  # convert 0-based to 1-based
+        except Exception:
+            continue
+    return images_by_row
+
+
+def extract_image_by_row(images_by_row: Dict[int, list], target_row):
+    """
+    Extract image anchored to the given Excel row.
+    target_row = actual Excel row (1-based)
+
+    Returns the raw embedded bytes (or a PIL image) undecoded; decoding and
+    encoding happen in the image encode pool.
+    """
+    for img in images_by_row.get(target_row, []):
+        try:
+            if hasattr(img, "_data"):
+                return img._data()
+            if hasattr(img, "image"):
+                return img.image
+        except Exception:
+            continue
+
+    return None
+
+
+def image_anchor_issues(images_by_row: Dict[int, list], data_rows) -> Dict[str, list]:
+    """Rows carrying more than one image, and images anchored outside any data row."""
+    multiple = [
+        {"row": row, "images": len(imgs)}
+        for row, imgs in sorted(images_by_row.items())
+        if row in data_rows and len(imgs) > 1
+    ]
+    orphans = [
+        {"row": row, "images": len(imgs)}
+        for row, imgs in sorted(images_by_row.items())
+        if row not in data_rows
+    ]
+    return {"multiple_images": multiple, "orphan_images": orphans}
+
+
+def existing_style_numbers(db: Session, styles) -> set:
+    """Style numbers from `styles` that already have a report, in one query per chunk."""
+    styles = list(styles)
+    found = set()
+    for start in range(0, len(styles), LOOKUP_CHUNK_SIZE):
+        chunk = styles[start:start + LOOKUP_CHUNK_SIZE]
+        found.update(
+            style for (style,) in db.query(Report.style_number).filter(Report.style_number.in_(chunk))
+        )
+    return found
+
+
+def load_reports(db: Session, report_nos: List[str]) -> List[Report]:
+    """Reports by report_no, in the order given, one query per chunk."""
+    by_no = {}
+    for start in range(0, len(report_nos), LOOKUP_CHUNK_SIZE):
+        chunk = report_nos[start:start + LOOKUP_CHUNK_SIZE]
+        by_no.update((r.report_no, r) for r in db.query(Report).filter(Report.report_no.in_(chunk)))
+    return [by_no[no] for no in report_nos if no in by_no]
+
+
+def await_batch_images(encoder: ImageEncodeQueue, batch: List[Report]):
+    """Rows are only written once their image is on disk; a failed encode drops the image."""
+    for r in batch:
+        if r.image_filename and not encoder.result(r.report_no):
+            r.image_filename = None
+
+
+def commit_report_batch(db: Session, batch: List[Report]):
+    """
+    Insert a batch of new reports in one transaction. If the batch fails, it is
+    retried row by row so only the offending rows are reported.
+    Returns (saved_reports, failed_rows).
+    """
+    report_nos = [r.report_no for r in batch]
+    db.add_all(batch)
+    try:
+        db.commit()
+        saved = batch
+        failed = []
+    except Exception:
+        db.rollback()
+        saved, failed = [], []
+        for r in batch:
+            db.add(r)
+            try:
+                db.commit()
+                saved.append(r)
+            except Exception as e:
+                db.rollback()
+                failed.append({"style_number": r.style_number, "error": str(getattr(e, "orig", e))})
+                if r.image_filename:
+                    for path in existing_upload_paths(r.image_filename):
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            pass
+
+    # reload the committed rows with one query instead of a refresh per row
+    if saved:
+        db.query(Report).filter(Report.report_no.in_(report_nos)).all()
+        # a QR scan may have cached a 404 before the report existed
+        invalidate_public_reports(r.report_no for r in saved)
+    return saved, failed
+
+
+# -------------------------------------------------------------
+#                ROW TRANSFORMATION (column-wise)
+# -------------------------------------------------------------
+# The scalar helpers below are memoised (typed, so 1, 1.0 and True stay
+# distinct) and mapped over whole columns: each distinct cell value is
+# parsed once, however many rows repeat it.
+@lru_cache(maxsize=4096)
+def count_in_words(n: int) -> str:
+    return num2words(n, to="cardinal").replace("-", " ").capitalize()
+
+
+@lru_cache(maxsize=65536)
+def _parse_diamond_count(text: str) -> int:
+    try:
+        return int(float(text))
+    except Exception:
+        return 0
+
+
+@lru_cache(maxsize=65536, typed=True)
+def _format_diamond_weight(raw) -> str:
+    if raw is None or raw == "":
+        return ""
+    try:
+        return f"{float(raw):.2f}"
+    except ValueError:
+        return str(raw).strip()  # fallback if invalid value
+
+
+@lru_cache(maxsize=1024, typed=True)
+def _igi_logo_flag(val) -> bool:
+    if not val:
+        return False
+    return str(val).strip().lower() in ["true", "1", "yes", "y"]
+
+
+def _clean_column(col: pd.Series) -> pd.Series:
+    """
+    One sheet column as text: str(value).strip() per cell, None for every kind
+    of blank (None, NaN, NaT, empty or whitespace-only strings).
+
+    Numbers are not reformatted. A column holding blanks is read as float, so a
+    whole number there arrives as 4.0 and renders "4.0", as it always has;
+    keeping that makes a re-uploaded sheet produce the descriptions already stored.
+    """
+    out = coerce_str_column(col)
+    out[out == ""] = None
+    return out
+
+
+def _clean_cells(df: pd.DataFrame) -> Dict[str, pd.Series]:
+    """Cleaned cells per column name (the first column wins for repeated names)."""
+    cells = {}
+    for j, name in enumerate(df.columns):
+        if name not in cells:
+            cells[name] = _clean_column(df.iloc[:, j])
+    return cells
+
+
+def _column(cells: Dict[str, pd.Series], index: pd.Index, name: str, default) -> pd.Series:
+    if name in cells:
+        return cells[name]
+    return pd.Series([default] * len(index), index=index, dtype=object)
+
+
+# infer_dtype() kinds whose cells can never be (or render as) text
+_NON_TEXT_KINDS = {
+    "empty", "integer", "floating", "mixed-integer-float", "decimal",
+    "boolean", "datetime", "datetime64", "date", "timedelta", "timedelta64", "time",
+}
+
+
+def _cell_text(col: pd.Series) -> pd.Series:
+    """str(value) per cell, "" for blanks."""
+    return col.map(lambda v: "" if v is None else str(v)).astype(object)
+
+
+def mandatory_rows(df: pd.DataFrame) -> np.ndarray:
+    """Boolean mask of rows where any cell mentions '(mandatory)' (template hint rows)."""
+    mask = np.zeros(len(df), dtype=bool)
+    for i in range(df.shape[1]):
+        col = df.iloc[:, i]
+        if pd.api.types.infer_dtype(col, skipna=True) in _NON_TEXT_KINDS:
+            continue
+        mask |= _cell_text(col).str.contains(r"\(mandatory\)", case=False, regex=True).to_numpy(dtype=bool)
+    return mask
+
+
+def transform_rows(
+    df: pd.DataFrame,
+    diamond_type: Optional[str] = None,
+    comment: Optional[str] = None,
+    igi_logo: bool = False,
+) -> pd.DataFrame:
+    """
+    Workbook rows -> Report text fields, one column per field, same index as df.
+    Blank cells render as "" in the built text and are stored as None for
+    color/clarity.
+    """
+    normalized_cols = {col.lower().strip(): col for col in df.columns}
+    cells = _clean_cells(df)
+
+    def column(name, default=""):
+        return _column(cells, df.index, name, default)
+
+    out = pd.DataFrame(index=df.index)
+    out["style_number"] = _cell_text(column("Style Number"))
+
+    # comment field (form value wins over the column)
+    comment_val = comment.strip() if comment else None
+    if not comment_val and "comment" in normalized_cols:
+        txt = _cell_text(column(normalized_cols["comment"]))
+        out["comment"] = pd.Series(np.where(txt != "", txt, comment_val), index=df.index, dtype=object)
+    else:
+        out["comment"] = pd.Series([comment_val] * len(df), index=df.index, dtype=object)
+
+    # diamond numbers
+    counts = _cell_text(column("No Of Diamonds", "0")).map(_parse_diamond_count)
+    count_text = counts.map(str).astype(object)
+    count_words = counts.map(count_in_words).astype(object)
+
+    diamond_type_used = diamond_type.strip() if diamond_type else None
+    diamonds_phrase = diamond_type_used if diamond_type_used else "Natural Diamonds"
+
+    jewel_desc = _cell_text(column("Jewelry Description"))
+    # auto convert earrings
+    jewel_desc = jewel_desc.mask(jewel_desc.str.lower().isin(EARRING_ALIASES), "pair of earrings")
+
+    out["description"] = (
+        "One " + _cell_text(column("Metal Color")) + " " + jewel_desc + ", "
+        + "weighing in total " + _cell_text(column("Gross Weight")) + "g, containing, "
+        + count_words + " (" + count_text + ") " + diamonds_phrase
+    )
+    out["shape_and_cut"] = "(" + count_text + ") " + _cell_text(column("Shape")) + " Brilliant"
+    out["tot_est_weight"] = column("Diamond Weight").map(_format_diamond_weight).astype(object)
+
+    out["color"] = column("Color Criteria")
+    out["clarity"] = column("Clarity Criteria")
+
+    # igi_logo (priority: form → column)
+    if igi_logo:
+        out["igi_logo"] = True
+    else:
+        key = next((k for k in IGI_LOGO_COLUMNS if k in normalized_cols), None)
+        if key:
+            out["igi_logo"] = column(normalized_cols[key], None).map(_igi_logo_flag).astype(bool)
+        else:
+            out["igi_logo"] = False
+
+    return out
+
+
+# -------------------------------------------------------------
+#                WORKBOOK INGEST
+# -------------------------------------------------------------
+def ingest_workbook(
+    db: Session,
+    workbook: Union[str, BinaryIO],
+    company_logo_filename: Optional[str] = None,
+    diamond_type: Optional[str] = None,
+    comment: Optional[str] = None,
+    isecopy: bool = False,
+    notice_image: bool = False,
+    igi_logo: bool = False,
+    progress: Optional[Callable[..., None]] = None,
+    checkpoint: Optional[Callable[[dict], None]] = None,
+    resume_from: Optional[dict] = None,
+) -> dict:
+    """
+    Turn an upload-xlsx workbook (path or file object) into reports.
+    Returns the upload-xlsx response body. `progress`, if given, is called
+    with total/done/skipped/failed row counts after every committed batch.
+
+    `checkpoint`, if given, is called after every committed batch with a
+    JSON-able state; passing that state back as `resume_from` continues after
+    the last committed row, and the result is the one an uninterrupted run
+    would have returned.
+    """
+    # ---------------------------------------------------------
+    # 1) LOAD XLSX
+    # ---------------------------------------------------------
+    wb = load_workbook(workbook)
+    sheet = wb["sheet1"] if "sheet1" in wb.sheetnames else wb[wb.sheetnames[0]]
+
+    df = pd.DataFrame(sheet.values)
+    df.columns = [str(c).strip() for c in df.iloc[0]]
+    df = df[1:]
+    df = df.dropna(subset=["Jewelry Description", "Style Number"], how="all")
+    df = df[df["Jewelry Description"].astype(str).str.strip() != ""]
+
+    # remove rows containing (mandatory)
+    df = df[~mandatory_rows(df)]
+    # the index is kept through the filters above: index + 1 is the sheet row
+
+    images_by_row = index_sheet_images(sheet)
+    fields = transform_rows(df, diamond_type=diamond_type, comment=comment, igi_logo=igi_logo)
+
+    if progress:
+        progress(total=len(df), done=0, skipped=0, failed=0)
+
+    # ---------------------------------------------------------
+    # 2) START PROCESSING ROWS
+    # ---------------------------------------------------------
+    reports = []
+    skipped = []
+    failed = []
+    pending = []
+
+    # duplicates: one set-based lookup against the DB, plus repeats inside the workbook
+    existing_styles = existing_style_numbers(db, set(fields["style_number"]) - {""})
+    seen_styles = set()
+
+    start = 0
+    uploaded_nos = []
+    if resume_from:
+        # rows before the offset were handled (and committed) by the interrupted run
+        start = resume_from["offset"]
+        skipped = list(resume_from["skipped"])
+        failed = list(resume_from["failed"])
+        uploaded_nos = list(resume_from["uploaded"])
+        reports = [ReportOut.model_validate(r) for r in load_reports(db, uploaded_nos)]
+        seen_styles = set(fields["style_number"].iloc[:start]) - {""}
+
+    def commit_pending(offset: int):
+        await_batch_images(encoder, pending)
+        saved, errors = commit_report_batch(db, pending)
+        reports.extend(ReportOut.model_validate(r) for r in saved)
+        uploaded_nos.extend(r.report_no for r in saved)
+        failed.extend(errors)
+        if checkpoint:
+            checkpoint({"offset": offset, "uploaded": uploaded_nos, "skipped": skipped, "failed": failed})
+
+    encoder = ImageEncodeQueue()
+
+    for pos, (idx, row) in enumerate(zip(fields.index, fields.to_dict("records"))):
+        if pos < start:
+            continue
+
+        style = row["style_number"]
+        if not style:
+            continue
+
+        # skip duplicates
+        if style in existing_styles or style in seen_styles:
+            skipped.append(style)
+            continue
+        seen_styles.add(style)
+
+        report_no = gen_report_no()
+
+        # ---------------------------------------------------------
+        # ⭐ 3) NEW FIX: GET IMAGE BY ANCHOR ROW
+        # ---------------------------------------------------------
+        excel_row = idx + 1  # Sheet row (header row is 1)
+        img = extract_image_by_row(images_by_row, excel_row)
+
+        image_filename = None
+        if img is not None:
+            safe_style = style.replace(" ", "_")
+            image_filename = f"{safe_style}{image_extension()}"
+            img_path = upload_path(image_filename)
+
+            # decode + encode in the process pool while the next rows are transformed
+            encoder.submit(report_no, img, img_path)
+
+        # ---------------------------------------------------------
+        # 4) SAVE REPORT
+        # ---------------------------------------------------------
+        new_report = Report(
+            report_no=report_no,
+            description=row["description"],
+            shape_and_cut=row["shape_and_cut"],
+            tot_est_weight=row["tot_est_weight"],
+            color=row["color"],
+            clarity=row["clarity"],
+            style_number=style,
+            image_filename=image_filename,
+            company_logo=company_logo_filename,
+            comment=row["comment"],
+            notice_image=notice_image,
+            isecopy=isecopy,
+            igi_logo=bool(row["igi_logo"]),
+        )
+
+        pending.append(new_report)
+        if len(pending) >= INGEST_BATCH_SIZE:
+            commit_pending(pos + 1)
+            pending = []
+            if progress:
+                progress(
+                    total=len(df),
+                    done=len(reports) + len(skipped) + len(failed),
+                    skipped=len(skipped),
+                    failed=len(failed),
+                )
+
+    if pending:
+        commit_pending(len(fields))
+
+    if progress:
+        progress(total=len(df), done=len(df), skipped=len(skipped), failed=len(failed))
+
+    if reports and IMAGE_VARIANTS_EAGER:
+        # the encode workers rendered variants for every image; keep the cache within its cap
+        enforce_variant_cache_limit()
+
+    # ---------------------------------------------------------
+    # 5) RETURN
+    # ---------------------------------------------------------
+    return {
+        "uploaded": reports,
+        "skipped": skipped,
+        "failed": failed,
+        "image_warnings": image_anchor_issues(images_by_row, {idx + 1 for idx in df.index}),
+        "msg": f"{len(reports)} reports uploaded, {len(skipped)} skipped"
+    }
@@ -0,0 +1,207 @@
+import json
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func, update
+
+from database import SessionLocal
+from models import IngestJob
+from reports.ingest import UPLOAD_DIR, ingest_workbook
+
+# Workbooks processed at the same time by background ingest jobs.
+INGEST_JOB_WORKERS = int(os.getenv("INGEST_JOB_WORKERS", "2"))
+INGEST_JOB_DIR = os.path.join(UPLOAD_DIR, "jobs")
+# A running job's worker renews its lease every INGEST_JOB_HEARTBEAT_SECONDS; a job
+# whose lease has not been renewed for INGEST_JOB_LEASE_SECONDS belongs to a dead
+# process and is resumed by the sweep that runs every INGEST_JOB_SWEEP_SECONDS (0 disables).
+INGEST_JOB_LEASE_SECONDS = int(os.getenv("INGEST_JOB_LEASE_SECONDS", "180"))
+INGEST_JOB_HEARTBEAT_SECONDS = int(os.getenv("INGEST_JOB_HEARTBEAT_SECONDS", "30"))
+INGEST_JOB_SWEEP_SECONDS = int(os.getenv("INGEST_JOB_SWEEP_SECONDS", "60"))
+
+_executor = ThreadPoolExecutor(max_workers=INGEST_JOB_WORKERS, thread_name_prefix="ingest-job")
+
+
+def job_status(job: IngestJob) -> dict:
+    out = {
+        "job_id": job.id,
+        "status": job.status,
+        "total": job.total_rows,
+        "done": job.rows_done,
+        "skipped": job.rows_skipped,
+        "failed": job.rows_failed,
+        "error": job.error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+    if job.status == "done" and job.result:
+        out["result"] = json.loads(job.result)
+    return out
+
+
+def enqueue_ingest_job(job_id: str):
+    _executor.submit(run_ingest_job, job_id)
+
+
+def _set_status(db, job_id: str, new: str, *conditions, **values) -> bool:
+    """Move a job to `new` only if it still matches `conditions`; True if this call did it."""
+    changed = db.execute(
+        update(IngestJob)
+        .where(IngestJob.id == job_id, *conditions)
+        .values(status=new, updated_at=func.now(), **values)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return changed == 1
+
+
+def _remove_workbook(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _heartbeat(job_id: str, stop: threading.Event):
+    """Renew the job's lease until `stop` is set, whatever phase the ingest is in."""
+    db = SessionLocal()
+    try:
+        while not stop.wait(INGEST_JOB_HEARTBEAT_SECONDS):
+            try:
+                db.execute(
+                    update(IngestJob)
+                    .where(IngestJob.id == job_id, IngestJob.status == "running")
+                    .values(updated_at=func.now())
+                    .execution_options(synchronize_session=False)
+                )
+                db.commit()
+            except Exception:
+                db.rollback()
+                traceback.print_exc()
+    finally:
+        db.close()
+
+
+def run_ingest_job(job_id: str):
+    """Worker body: runs ingest_workbook for the job and records progress/result on its row."""
+    db = SessionLocal()
+    stop = threading.Event()
+    try:
+        # every API worker may have queued the job: only the one that flips it to running goes on
+        if not _set_status(db, job_id, "running", IngestJob.status == "queued"):
+            return
+        job = db.get(IngestJob, job_id)
+        threading.Thread(
+            target=_heartbeat, args=(job_id, stop), name=f"ingest-lease-{job_id[:8]}", daemon=True
+        ).start()
+
+        def progress(total, done, skipped, failed):
+            job.total_rows = total
+            job.rows_done = done
+            job.rows_skipped = skipped
+            job.rows_failed = failed
+            db.commit()
+
+        def checkpoint(state):
+            job.checkpoint = json.dumps(state)
+            db.commit()
+
+        params = json.loads(job.params)
+        resume_from = json.loads(job.checkpoint) if job.checkpoint else None
+        try:
+            result = ingest_workbook(
+                db, job.workbook_path, progress=progress, checkpoint=checkpoint, resume_from=resume_from, **params
+            )
+        except Exception as e:
+            traceback.print_exc()
+            db.rollback()
+            job.status = "failed"
+            job.error = str(e)[:2000]
+            db.commit()
+            _remove_workbook(job.workbook_path)
+            return
+
+        job.result = json.dumps(jsonable_encoder(result))
+        job.checkpoint = None
+        job.status = "done"
+        db.commit()
+        _remove_workbook(job.workbook_path)
+    finally:
+        stop.set()
+        db.close()
+
+
+def requeue_stale_jobs(include_queued: bool = False) -> int:
+    """
+    Queue jobs whose lease ran out: running jobs of a dead process and, with
+    include_queued, every queued job (else only those nobody picked up within
+    the lease). A resumed job continues after its last committed batch (see
+    IngestJob.checkpoint). Every API worker may call this; each job still runs
+    in exactly one worker, see run_ingest_job.
+    """
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=INGEST_JOB_LEASE_SECONDS)
+    db = SessionLocal()
+    try:
+        jobs = db.query(IngestJob.id, IngestJob.status, IngestJob.workbook_path).filter(
+            IngestJob.status.in_(["queued", "running"])
+        ).all()
+        resume = []
+        for job_id, status, workbook_path in jobs:
+            if not os.path.exists(workbook_path):
+                _set_status(db, job_id, "failed", IngestJob.status == status, error="Workbook missing after restart")
+            elif status == "queued" and include_queued:
+                resume.append(job_id)
+            elif _set_status(db, job_id, "queued", IngestJob.status == status, IngestJob.updated_at < stale_before):
+                # the conditional update also renews the lease, so other workers leave the job alone
+                resume.append(job_id)
+        for job_id in resume:
+            print(f"🔄 Resuming ingest job {job_id}")
+            enqueue_ingest_job(job_id)
+        return len(resume)
+    finally:
+        db.close()
+
+
+def resume_ingest_jobs():
+    """Called at startup by every API worker: queue pending jobs and resume abandoned ones."""
+    requeue_stale_jobs(include_queued=True)
+
+
+def _sweep_loop(interval: float):
+    while True:
+        time.sleep(interval)
+        try:
+            requeue_stale_jobs()
+        except Exception:
+            print("❌ Ingest job sweep failed:")
+            traceback.print_exc()
+
+
+def start_job_sweeper(interval: Optional[float] = None):
+    """Keep resuming abandoned jobs while the app runs, not only at startup."""
+    interval = INGEST_JOB_SWEEP_SECONDS if interval is None else interval
+    if interval <= 0:
+        return
+    threading.Thread(target=_sweep_loop, args=(interval,), name="ingest-job-sweep", daemon=True).start()
+
+
+def stale_workbooks(db, min_age: float):
+    """Files in INGEST_JOB_DIR older than min_age that no queued or running job will read."""
+    if not os.path.isdir(INGEST_JOB_DIR):
+        return []
+    live = {
+        path for (path,) in db.query(IngestJob.workbook_path).filter(IngestJob.status.in_(["queued", "running"]))
+    }
+    cutoff = time.time() - min_age
+    return [
+        entry.path
+        for entry in os.scandir(INGEST_JOB_DIR)
+        if entry.is_file(follow_symlinks=False)
+        and entry.path not in live
+        and entry.stat(follow_symlinks=False).st_ctime <= cutoff
+    ]
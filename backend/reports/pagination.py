@@ -0,0 +1,107 @@
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from models import Report
+
+# Rows fetched per round trip while streaming the all-records listing.
+LIST_STREAM_BATCH_SIZE = int(os.getenv("LIST_STREAM_BATCH_SIZE", "1000"))
+
+
+def encode_cursor(created_at: datetime, report_id: int, rank: Optional[int] = None) -> str:
+    """
+    Opaque next-page token: the (created_at, id) of the last row served,
+    plus its search rank when the listing is a ranked search.
+    """
+    key = [created_at.isoformat(), report_id]
+    if rank is not None:
+        key.append(rank)
+    raw = json.dumps(key).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int, Optional[int]]:
+    """Inverse of encode_cursor; raises ValueError for anything it did not produce."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(raw)
+        if not isinstance(key, list) or len(key) not in (2, 3):
+            raise ValueError
+        rank = int(key[2]) if len(key) == 3 else None
+        return datetime.fromisoformat(key[0]), int(key[1]), rank
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def created_key(query: Query):
+    """
+    created_at as the listing compares it. SQLite keeps timestamps as text in two
+    shapes (server_default rows have no fraction, rows written from Python have
+    microseconds), so there both sides are normalised to one millisecond format.
+    """
+    if query.session.get_bind().dialect.name == "sqlite":
+        return func.strftime("%Y-%m-%d %H:%M:%f", Report.created_at)
+    return Report.created_at
+
+
+def created_value(query: Query, created_at: datetime):
+    if query.session.get_bind().dialect.name == "sqlite":
+        return created_at.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    return created_at
+
+
+def newest_first(query: Query, rank: Optional[ColumnElement] = None) -> Query:
+    """
+    Listing order; id breaks created_at ties so every row has a fixed position.
+    Searches sort by rank (best match) first.
+    """
+    order = [created_key(query).desc(), Report.id.desc()]
+    if rank is not None:
+        order.insert(0, rank)
+    return query.order_by(*order)
+
+
+def after_cursor(query: Query, cursor: str, rank: Optional[ColumnElement] = None) -> Query:
+    """Rows that sort after the cursor in newest_first order (served by ix_reports_created_id)."""
+    created_at, report_id, last_rank = decode_cursor(cursor)
+    if (rank is None) != (last_rank is None):
+        raise ValueError("Cursor does not belong to this search")
+    key, value = created_key(query), created_value(query, created_at)
+    older = or_(
+        key < value,
+        and_(key == value, Report.id < report_id),
+    )
+    if rank is None:
+        return query.filter(older)
+    return query.filter(or_(rank > last_rank, and_(rank == last_rank, older)))
+
+
+def estimate_count(db: Session, query: Query) -> Optional[int]:
+    """
+    Planner row estimate for the listing query, without scanning it.
+    Only PostgreSQL has one; other backends get an exact count.
+    """
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return query.order_by(None).count()
+    compiled = query.order_by(None).statement.compile(dialect=bind.dialect)
+    plan = db.connection().exec_driver_sql(
+        "EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_rows(db: Session, query: Query, mode: str) -> Optional[int]:
+    if mode == "none":
+        return None
+    if mode == "estimate":
+        return estimate_count(db, query)
+    return query.order_by(None).count()
@@ -1,21 +1,77 @@
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Query
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Query, Request, Response
 from fastapi.responses import StreamingResponse, FileResponse
+from sqlalchemy import delete, or_
 from sqlalchemy.orm import Session
-from models import Report, UploadedPDF
-from schemas import ReportOut, ReportListItem,BatchDeleteRequest
-from database import get_db
-from utils import gen_report_no, compose_card_image
+from models import Report, UploadedPDF, IngestJob
+from schemas import ReportOut, ReportListItem,BatchDeleteRequest, CardExportRequest
+from database import get_db, SessionLocal
+from executors import run_blocking, run_heavy, save_upload
 from auth.dependencies import get_current_user
+from reports.ingest import LOOKUP_CHUNK_SIZE, ingest_workbook
+from reports.jobs import INGEST_JOB_DIR, enqueue_ingest_job, job_status
+from reports.pagination import (
+    LIST_STREAM_BATCH_SIZE,
+    after_cursor,
+    count_rows,
+    created_key,
+    created_value,
+    encode_cursor,
+    newest_first,
+)
+from reports.search import search_terms
+from reports.conditional import (
+    PRIVATE_CACHE_CONTROL,
+    PUBLIC_REPORT_CACHE_CONTROL,
+    conditional_json,
+    is_not_modified,
+    prepare_json,
+)
+from reports.storage import (
+    new_temp_path,
+    resolve_upload,
+    spool_to_temp,
+    store_upload,
+    store_upload_fileobj,
+)
+from reports.cleanup import schedule_file_removal, unreferenced_files
+from reports.cards import card_key, iter_rendered_cards, render_card
+from reports.variants import VARIANT_FORMATS, VARIANT_SIZES, ensure_variant, render_variants_for
+from reports.cache import (
+    PUBLIC_REPORT_NEGATIVE_TTL,
+    invalidate_public_reports,
+    public_report_cache,
+)
+from reports.backup import (
+    BACKUP_BATCH_SIZE,
+    BACKUP_COLUMNS,
+    BACKUP_IMPORT_CHUNK_SIZE,
+    MANIFEST_NAME,
+    ZIP_UPLOAD_MAX_BYTES,
+    ZipChunkSink,
+    build_manifest,
+    extract_zip_member,
+    file_sha256,
+    parse_manifest,
+    read_zip_manifest,
+    report_backup_row,
+    restore_frame,
+    spooled_size,
+    stream_file_into_zip,
+    upsert_reports,
+)
 import pandas as pd
-import io
+import hashlib
+import json
 import os
+import shutil
+import tempfile
+import traceback
+import uuid
 import zipfile
-from num2words import num2words
-from openpyxl import load_workbook
-from PIL import Image
+from openpyxl import Workbook
 from openpyxl_image_loader import SheetImageLoader
-from typing import Optional, List, Dict
-from datetime import datetime
+from typing import Optional, List, Dict, Iterator
+from datetime import datetime, timezone
 
 router = APIRouter(
     prefix="/reports",
@@ -24,72 +80,136 @@ router = APIRouter(
 )
 
 public_router = APIRouter(prefix="/public-report", tags=["Public Reports"])
+variants_router = APIRouter(prefix="/image-variants", tags=["Image Variants"])
+
+# Variant files never change under a URL while the source image stays the same.
+IMAGE_VARIANT_CACHE_CONTROL = "public, max-age=86400"
 
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-# ==========================================================
-# Helper Function
-# ==========================================================
-def _reports_to_dataframe(reports: List[Report]) -> pd.DataFrame:
-    rows = []
-    for r in reports:
-        rows.append({
-            "report_no": r.report_no,
-            "description": r.description,
-            "shape_and_cut": r.shape_and_cut,
-            "tot_est_weight": r.tot_est_weight,
-            "color": r.color,
-            "clarity": r.clarity,
-            "style_number": r.style_number,
-            "image_filename": r.image_filename,
-            "comment": r.comment,
-            "isecopy": bool(r.isecopy),
-            "notice_image": bool(r.notice_image),
-            "igi_logo": bool(getattr(r, "igi_logo", False)),
-            "company_logo": r.company_logo,
-            "created_at": r.created_at.isoformat() if r.created_at else None,
-        })
-    return pd.DataFrame(rows)
+# Report numbers per DELETE ... RETURNING statement in /reports/batch-delete.
+BATCH_DELETE_CHUNK_SIZE = int(os.getenv("BATCH_DELETE_CHUNK_SIZE", "1000"))
+
 
 # ==========================================================
 # Export Backup
 # ==========================================================
+def _iter_backup_zip(
+    since: Optional[datetime] = None,
+    base_files: Optional[Dict[str, str]] = None,
+) -> Iterator[bytes]:
+    """
+    Build the backup archive front to back: rows are read through a
+    server-side cursor, images/logos are added as their rows are reached
+    and reports.xlsx (spooled to a temp file by the write-only workbook)
+    goes in last. Peak memory stays at roughly one batch of rows.
+
+    With `since`, only reports created or edited after that moment are
+    exported, and files whose hash matches `base_files` (the manifest of
+    the previous backup) are left out.
+    """
+    generated_at = datetime.now(timezone.utc)
+    files = dict(base_files or {})
+    db = SessionLocal()
+    tmp_dir = tempfile.mkdtemp(prefix="backup_")
+    try:
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("reports")
+        ws.append(BACKUP_COLUMNS)
+
+        sink = ZipChunkSink()
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+            added = set()
+            written = {}  # (st_dev, st_ino) -> (arcname, sha256) of files stored in this archive
+            links = {}
+            query = db.query(Report)
+            if since:
+                query = query.filter(or_(Report.created_at > since, Report.updated_at > since))
+            reports = (
+                query.order_by(Report.created_at.asc(), Report.id.asc())
+                .yield_per(BACKUP_BATCH_SIZE)
+            )
+            count = 0
+            for r in reports:
+                ws.append(report_backup_row(r))
+                count += 1
+
+                members = []
+                if r.image_filename:
+                    members.append((resolve_upload(r.image_filename), f"images/{r.image_filename}"))
+                # include company logo files too (if present)
+                if r.company_logo:
+                    members.append((resolve_upload(r.company_logo, "logo"), f"logo/{r.company_logo}"))
+
+                for src, arcname in members:
+                    if arcname in added or not os.path.exists(src):
+                        continue
+                    added.add(arcname)
+                    st = os.stat(src)
+                    # another name for a blob already in this archive: record a link, not the bytes
+                    same = written.get((st.st_dev, st.st_ino))
+                    if same:
+                        first, digest = same
+                        files[arcname] = digest
+                        if not (base_files and base_files.get(arcname) == digest):
+                            links[arcname] = first
+                        continue
+                    if base_files and arcname in base_files:
+                        digest = file_sha256(src)
+                        if digest == base_files[arcname]:
+                            continue  # unchanged since the base backup
+                        yield from stream_file_into_zip(zf, sink, src, arcname)
+                    else:
+                        hasher = hashlib.sha256()
+                        yield from stream_file_into_zip(zf, sink, src, arcname, hasher=hasher)
+                        digest = hasher.hexdigest()
+                    files[arcname] = digest
+                    written[(st.st_dev, st.st_ino)] = (arcname, digest)
+
+            xlsx_path = os.path.join(tmp_dir, "reports.xlsx")
+            wb.save(xlsx_path)
+            yield from stream_file_into_zip(zf, sink, xlsx_path, "reports.xlsx")
+
+            zf.writestr(MANIFEST_NAME, build_manifest(generated_at, since, files, count, links))
+
+        # manifest + central directory
+        yield sink.drain()
+    finally:
+        db.close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
 @router.post("/export-backup")
 def export_backup(
-    db: Session = Depends(get_db),
+    since: Optional[datetime] = Form(None),
+    base_manifest: UploadFile = File(None),
     current_user: dict = Depends(get_current_user)
 ):
-    reports = db.query(Report).order_by(Report.created_at.asc()).all()
-    df = _reports_to_dataframe(reports)
-
-    excel_buf = io.BytesIO()
-    with pd.ExcelWriter(excel_buf, engine="openpyxl") as writer:
-        df.to_excel(writer, sheet_name="reports", index=False)
-    excel_buf.seek(0)
-
-    zip_buf = io.BytesIO()
-    with zipfile.ZipFile(zip_buf, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
-        zf.writestr("reports.xlsx", excel_buf.read())
-        added = set()
-        for r in reports:
-            if r.image_filename:
-                src = os.path.join(UPLOAD_DIR, r.image_filename)
-                if os.path.exists(src) and r.image_filename not in added:
-                    zf.write(src, arcname=f"images/{r.image_filename}")
-                    added.add(r.image_filename)
-            # include company logo files too (if present)
-            if r.company_logo:
-                logo_path = os.path.join(UPLOAD_DIR, "logo", r.company_logo)
-                if os.path.exists(logo_path) and r.company_logo not in added:
-                    zf.write(logo_path, arcname=f"logo/{r.company_logo}")
-                    added.add(r.company_logo)
-    zip_buf.seek(0)
+    """
+    Full backup by default.
+
+    Incremental: pass `base_manifest` (manifest.json from the previous full or
+    incremental backup) and/or `since`. Without an explicit `since`, the base
+    manifest's generated_at is used.
+    """
+    base_files = None
+    if base_manifest:
+        try:
+            manifest = parse_manifest(base_manifest.file.read())
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        base_files = manifest["files"]
+        since = since or manifest["generated_at"]
+
+    if since and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
 
     now_str = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    filename = f"reports_backup_{now_str}.zip"
+    kind = "delta" if since else "backup"
+    filename = f"reports_{kind}_{now_str}.zip"
     return StreamingResponse(
-        zip_buf,
+        _iter_backup_zip(since, base_files),
         media_type="application/zip",
         headers={"Content-Disposition": f'attachment; filename="{filename}"'}
     )
@@ -97,115 +217,150 @@ def export_backup(
 # ==========================================================
 # Import Backup
 # ==========================================================
+def _check_zip_upload_size(upload: UploadFile):
+    size = upload.size if upload.size is not None else spooled_size(upload.file)
+    if size > ZIP_UPLOAD_MAX_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"{upload.filename} is larger than {ZIP_UPLOAD_MAX_BYTES // (1024 * 1024)} MB"
+        )
+
+
+def _apply_backup_zip(zf: zipfile.ZipFile, overwrite: bool, db: Session, manifest: Optional[dict] = None):
+    """Restore one backup archive (full or delta) into the database and UPLOAD_DIR."""
+    if "reports.xlsx" not in zf.namelist():
+        raise HTTPException(status_code=400, detail="reports.xlsx missing in zip")
+    with tempfile.TemporaryDirectory(prefix="restore_") as tmp_dir:
+        xlsx_path = os.path.join(tmp_dir, "reports.xlsx")
+        extract_zip_member(zf, "reports.xlsx", xlsx_path)
+        df = pd.read_excel(xlsx_path, sheet_name="reports")
+    df.columns = [c.strip() for c in df.columns]
+    required = {
+        "report_no","description","shape_and_cut","tot_est_weight",
+        "color","clarity","style_number","image_filename",
+        "comment","isecopy","created_at","notice_image","igi_logo"
+    }
+    missing = required - set(df.columns)
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing columns: {', '.join(sorted(missing))}")
+
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    image_members = {}
+    logo_members = {}
+
+    for name in zf.namelist():
+        if name.startswith("images/") and len(name.split("/",1))==2:
+            image_members[name.split("/",1)[1]] = name
+        if name.startswith("logo/") and len(name.split("/",1))==2:
+            logo_members[name.split("/",1)[1]] = name
+
+    frame = restore_frame(df)
+
+    missing_no = frame["report_no"].isna() | (frame["report_no"] == "")
+    skipped = ["missing_report_no"] * int(missing_no.sum())
+    # a report_no listed twice, as row by row: with overwrite the later rows
+    # updated the first one (last wins), without it they were skipped (first wins)
+    frame = frame[~missing_no]
+    repeats = frame["report_no"].duplicated(keep="last" if overwrite else "first")
+    repeated_nos = frame.loc[repeats, "report_no"].tolist()
+    frame = frame[~repeats]
+
+    # restore each referenced file once, not once per row; files the archive
+    # stored once for several names are listed in the manifest's links
+    links = (manifest or {}).get("links") or {}
+    for arcname, source in links.items():
+        folder, _, fn = arcname.partition("/")
+        members = image_members if folder == "images" else logo_members if folder == "logo" else None
+        if members is not None and fn and fn not in members and source in zf.namelist():
+            members[fn] = source
+
+    for image_filename in frame["image_filename"].dropna().unique():
+        if image_filename in image_members:
+            with zf.open(image_members[image_filename]) as src:
+                store_upload_fileobj(src, image_filename)
+
+    # company logo (if present in zip)
+    for company_logo_fn in frame["company_logo"].dropna().unique():
+        if company_logo_fn in logo_members:
+            with zf.open(logo_members[company_logo_fn]) as src:
+                store_upload_fileobj(src, company_logo_fn, "logo")
+
+    imported, updated = 0, 0
+    if overwrite:
+        updated += len(repeated_nos)
+    else:
+        skipped.extend(repeated_nos)
+    rows = frame.to_dict("records")
+    for start in range(0, len(rows), BACKUP_IMPORT_CHUNK_SIZE):
+        i, u, s = upsert_reports(db, rows[start:start + BACKUP_IMPORT_CHUNK_SIZE], overwrite)
+        imported += i
+        updated += u
+        skipped.extend(s)
+
+    return imported, updated, skipped
+
+
 @router.post("/import-backup")
 async def import_backup(
     file: UploadFile = File(...),
+    deltas: List[UploadFile] = File(None),
     overwrite: bool = Form(True),
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    if not file.filename.lower().endswith(".zip"):
-        raise HTTPException(status_code=400, detail="Upload a .zip created by /reports/export-backup")
-    blob = await file.read()
-    buf = io.BytesIO(blob)
+    """
+    Restore `file` (a full backup, or a delta onto the current data), then
+    each of `deltas` in the order given. Every archive must continue where
+    the previous one ended: its `since` may not be later than the previous
+    archive's generated_at.
+    """
+    archives = [file] + list(deltas or [])
+    for upload in archives:
+        if not upload.filename.lower().endswith(".zip"):
+            raise HTTPException(status_code=400, detail="Upload a .zip created by /reports/export-backup")
 
-    try:
-        with zipfile.ZipFile(buf, "r") as zf:
-            if "reports.xlsx" not in zf.namelist():
-                raise HTTPException(status_code=400, detail="reports.xlsx missing in zip")
-            df = pd.read_excel(io.BytesIO(zf.read("reports.xlsx")), sheet_name="reports")
-            df.columns = [c.strip() for c in df.columns]
-            required = {
-                "report_no","description","shape_and_cut","tot_est_weight",
-                "color","clarity","style_number","image_filename",
-                "comment","isecopy","created_at","notice_image","igi_logo"
-            }
-            missing = required - set(df.columns)
-            if missing:
-                raise HTTPException(status_code=400, detail=f"Missing columns: {', '.join(sorted(missing))}")
-
-            os.makedirs(UPLOAD_DIR, exist_ok=True)
-            image_members = {}
-            logo_members = {}
-
-            for name in zf.namelist():
-                if name.startswith("images/") and len(name.split("/",1))==2:
-                    image_members[name.split("/",1)[1]] = name
-                if name.startswith("logo/") and len(name.split("/",1))==2:
-                    logo_members[name.split("/",1)[1]] = name
-
-            imported, updated, skipped = 0, 0, []
-
-            def safe_str(val):
-                return str(val).strip() if pd.notna(val) else None
-
-            def parse_bool(val):
-                if pd.isna(val):
-                    return False
-                if isinstance(val, bool):
-                    return val
-                return str(val).strip().lower() in {"true","1","yes","y","t"}
-
-            for _, row in df.iterrows():
-                report_no = safe_str(row["report_no"])
-                if not report_no:
-                    skipped.append("missing_report_no")
-                    continue
+    # zip reading, pandas and the bulk upserts all block; keep them off the event loop
+    return await run_heavy(_restore_archives, archives, overwrite, db)
 
-                fields = {
-                    "description": safe_str(row["description"]),
-                    "shape_and_cut": safe_str(row["shape_and_cut"]),
-                    "tot_est_weight": safe_str(row["tot_est_weight"]),
-                    "color": safe_str(row["color"]),
-                    "clarity": safe_str(row["clarity"]),
-                    "style_number": safe_str(row["style_number"]),
-                    "comment": safe_str(row["comment"]),
-                }
-                fields["isecopy"] = parse_bool(row["isecopy"])
-                fields["notice_image"] = parse_bool(row["notice_image"])
-                fields["igi_logo"] = parse_bool(row["igi_logo"])
-
-                image_filename = safe_str(row["image_filename"])
-                if image_filename and image_filename in image_members:
-                    data = zf.read(image_members[image_filename])
-                    with open(os.path.join(UPLOAD_DIR, image_filename), "wb") as f:
-                        f.write(data)
-                    fields["image_filename"] = image_filename
-                else:
-                    fields["image_filename"] = image_filename
-
-                # company logo (if present in zip)
-                company_logo_fn = safe_str(row.get("company_logo"))
-                if company_logo_fn and company_logo_fn in logo_members:
-                    logo_data = zf.read(logo_members[company_logo_fn])
-                    logo_dir = os.path.join(UPLOAD_DIR, "logo")
-                    os.makedirs(logo_dir, exist_ok=True)
-                    with open(os.path.join(logo_dir, company_logo_fn), "wb") as f:
-                        f.write(logo_data)
-                    fields["company_logo"] = company_logo_fn
-                else:
-                    fields["company_logo"] = company_logo_fn
-
-                existing = db.query(Report).filter(Report.report_no == report_no).first()
-                if existing:
-                    if overwrite:
-                        for k, v in fields.items():
-                            setattr(existing, k, v)
-                        db.commit()
-                        db.refresh(existing)
-                        updated += 1
-                    else:
-                        skipped.append(report_no)
-                else:
-                    obj = Report(report_no=report_no, **fields)
-                    db.add(obj)
-                    db.commit()
-                    db.refresh(obj)
-                    imported += 1
-
-        return {"imported": imported, "updated": updated, "skipped": skipped}
-    except zipfile.BadZipFile:
-        raise HTTPException(status_code=400, detail="Invalid zip file")
+
+def _restore_archives(archives: List[UploadFile], overwrite: bool, db: Session) -> dict:
+    for upload in archives:
+        _check_zip_upload_size(upload)
+
+    imported, updated, skipped = 0, 0, []
+    previous = None
+
+    for upload in archives:
+        upload.file.seek(0)
+        try:
+            # read straight from the spooled temp file; members are extracted one by one
+            with zipfile.ZipFile(upload.file, "r") as zf:
+                try:
+                    manifest = read_zip_manifest(zf)
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=f"{upload.filename}: {e}")
+
+                if previous and manifest:
+                    if manifest["kind"] != "incremental":
+                        raise HTTPException(status_code=400, detail=f"{upload.filename} is not an incremental backup")
+                    if manifest["since"] > previous["generated_at"]:
+                        raise HTTPException(
+                            status_code=400,
+                            detail=f"{upload.filename} starts after the previous backup ended; a delta is missing"
+                        )
+
+                i, u, s = _apply_backup_zip(zf, overwrite, db, manifest)
+                imported += i
+                updated += u
+                skipped.extend(s)
+                previous = manifest
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=400, detail=f"Invalid zip file: {upload.filename}")
+
+    # restores can touch any number of reports
+    public_report_cache.clear()
+
+    return {"imported": imported, "updated": updated, "skipped": skipped}
 
 # ==========================================================
 # New Route: Upload PDF ZIP (Seed PDF Data)
@@ -219,14 +374,15 @@ async def upload_pdf_zip(
     if not file.filename.lower().endswith(".zip"):
         raise HTTPException(status_code=400, detail="Please upload a valid .zip file")
 
-    pdf_dir = os.path.join(UPLOAD_DIR, "pdfs")
-    os.makedirs(pdf_dir, exist_ok=True)
+    return await run_heavy(_extract_pdf_zip, file, db)
 
-    blob = await file.read()
-    buf = io.BytesIO(blob)
+
+def _extract_pdf_zip(file: UploadFile, db: Session) -> dict:
+    _check_zip_upload_size(file)
+    file.file.seek(0)
 
     try:
-        with zipfile.ZipFile(buf, "r") as zf:
+        with zipfile.ZipFile(file.file, "r") as zf:
             pdf_files = [n for n in zf.namelist() if n.lower().endswith(".pdf")]
             if not pdf_files:
                 raise HTTPException(status_code=400, detail="No PDF files found in zip")
@@ -239,11 +395,10 @@ async def upload_pdf_zip(
                     continue
 
                 report_no, _ = os.path.splitext(base_name)
-                pdf_path = os.path.join(pdf_dir, f"{report_no}.pdf")
 
                 # Save PDF
-                with zf.open(name) as src, open(pdf_path, "wb") as dst:
-                    shutil.copyfileobj(src, dst)
+                with zf.open(name) as src:
+                    store_upload_fileobj(src, f"{report_no}.pdf", "pdfs")
 
                 # Insert DB row
                 upload_log = UploadedPDF(
@@ -259,12 +414,18 @@ async def upload_pdf_zip(
             except Exception as e:
                 db.rollback()
                 raise HTTPException(status_code=500, detail=f"DB Error: {str(e)}")
+            finally:
+                # the PDFs are on disk either way
+                invalidate_public_reports(saved_files)
 
         return {"msg": f"{len(saved_files)} PDFs uploaded successfully", "reports": saved_files}
 
     except zipfile.BadZipFile:
         raise HTTPException(status_code=400, detail="Invalid zip file")
 
+    except HTTPException:
+        raise
+
     except Exception as e:
         print("\nZIP UPLOAD ERROR:", e)
         traceback.print_exc()
@@ -272,51 +433,112 @@ async def upload_pdf_zip(
 
 
 @public_router.get("/{report_no}")
-def get_public_report(report_no: str, db: Session = Depends(get_db)):
+def get_public_report(report_no: str, request: Request, db: Session = Depends(get_db)):
     """
     Return: uploads/pdfs/<report_no>.pdf (relative path)
     If PDF not found → return JSON report.
+    Carries ETag/Last-Modified; a matching If-None-Match gets a 304.
     """
+    generation = public_report_cache.generation()
+    hit, prepared = public_report_cache.get(report_no, generation)
+    if hit:
+        if prepared is None:
+            raise HTTPException(status_code=404, detail="Report not found")
+        return conditional_json(request, prepared, PUBLIC_REPORT_CACHE_CONTROL)
+
     pdf_filename = f"{report_no}.pdf"
-    pdf_path = os.path.join(UPLOAD_DIR, "pdfs", pdf_filename)
+    pdf_path = resolve_upload(pdf_filename, "pdfs")
 
     # If the PDF exists → return relative path
     if os.path.exists(pdf_path):
-        return {"pdf_path": f"uploads/pdfs/{pdf_filename}"}
+        mtime = datetime.fromtimestamp(os.path.getmtime(pdf_path), tz=timezone.utc)
+        prepared = prepare_json({"pdf_path": f"uploads/pdfs/{pdf_filename}"}, last_modified=mtime)
+        public_report_cache.set(report_no, prepared, generation)
+        return conditional_json(request, prepared, PUBLIC_REPORT_CACHE_CONTROL)
 
     # fallback: return JSON from DB if PDF not found
     report = db.query(Report).filter(Report.report_no == report_no).first()
     if not report:
+        public_report_cache.set(report_no, None, generation, ttl=PUBLIC_REPORT_NEGATIVE_TTL)
         raise HTTPException(status_code=404, detail="Report not found")
 
-    return ReportOut.model_validate(report)
+    prepared = prepare_json(
+        ReportOut.model_validate(report),
+        last_modified=report.updated_at or report.created_at,
+    )
+    public_report_cache.set(report_no, prepared, generation)
+    return conditional_json(request, prepared, PUBLIC_REPORT_CACHE_CONTROL)
 
 
-def extract_image_by_row(sheet, target_row):
+@public_router.get("/{report_no}/card.png")
+def get_report_card(report_no: str, request: Request, db: Session = Depends(get_db)):
     """
-    Extract image anchored to the given Excel row.
-    target_row = actual Excel row (1-based)
+    Report card PNG (fields, photo, QR). Cards are cached by a hash of their
+    content, which is also the ETag, so revalidation never renders.
     """
-    for img in getattr(sheet, "_images", []):
-        try:
-            anchor = img.anchor._from
-            excel_row = anchor.row + 1  # convert 0-based to 1-based
+    report = db.query(Report).filter(Report.report_no == report_no).first()
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
 
-            if excel_row == target_row:
-                if hasattr(img, "_data"):
-                    return Image.open(io.BytesIO(img._data()))
-                if hasattr(img, "image"):
-                    return img.image
+    key = card_key(report)
+    headers = {"ETag": f'"{key[:32]}"', "Cache-Control": PUBLIC_REPORT_CACHE_CONTROL}
+    if is_not_modified(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
 
-        except Exception:
-            continue
+    _, path = render_card(report, key)
+    return FileResponse(path, media_type="image/png", headers=headers)
 
-    return None
+
+@variants_router.get("/{variant}/{fmt}/{image_filename}")
+def get_image_variant(variant: str, fmt: str, image_filename: str):
+    """
+    Resized / re-encoded report image (thumb, card or full; webp or png).
+    Rendered on first request and kept in the size-capped variant cache.
+    """
+    if variant not in VARIANT_SIZES or fmt not in VARIANT_FORMATS:
+        raise HTTPException(status_code=404, detail="Unknown image variant")
+    if "/" in image_filename or "\\" in image_filename or image_filename.startswith("."):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    try:
+        path = ensure_variant(image_filename, variant, fmt)
+    except OSError:
+        # not a readable image (e.g. a stray non-image upload)
+        path = None
+    if path is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return FileResponse(
+        path,
+        media_type=f"image/{fmt}",
+        headers={"Cache-Control": IMAGE_VARIANT_CACHE_CONTROL},
+    )
 
 
 # -------------------------------------------------------------
 #                MAIN UPLOAD ENDPOINT
 # -------------------------------------------------------------
+def _save_company_logo(company_logo: Optional[UploadFile]) -> Optional[str]:
+    if not company_logo:
+        return None
+
+    ext = company_logo.filename.split(".")[-1].lower()
+    if ext not in ["png", "jpg", "jpeg", "webp"]:
+        raise HTTPException(400, "company_logo must be png/jpg/jpeg/webp")
+
+    return _store_company_logo(company_logo.file, ext)
+
+
+def _store_company_logo(fileobj, ext: str) -> str:
+    """
+    Save a logo under a name derived from its content, so uploading the same
+    logo again reuses the stored file (and its name) instead of adding a copy.
+    """
+    tmp_path, digest = spool_to_temp(fileobj)
+    company_logo_filename = f"company_logo_{digest[:20]}.{ext}"
+    store_upload(tmp_path, company_logo_filename, "logo", digest)
+    return company_logo_filename
+
+
 @router.post("/upload-xlsx")
 def upload_xlsx(
     file: UploadFile = File(...),
@@ -333,212 +555,233 @@ def upload_xlsx(
     # ---------------------------------------------------------
     # 1) SAVE COMPANY LOGO (if uploaded)
     # ---------------------------------------------------------
-    company_logo_filename = None
-
-    if company_logo:
-        ext = company_logo.filename.split(".")[-1].lower()
-        if ext not in ["png", "jpg", "jpeg", "webp"]:
-            raise HTTPException(400, "company_logo must be png/jpg/jpeg/webp")
-
-        logo_dir = os.path.join(UPLOAD_DIR, "logo")
-        os.makedirs(logo_dir, exist_ok=True)
-
-        company_logo_filename = f"company_logo_{datetime.utcnow().timestamp()}.{ext}"
-        logo_path = os.path.join(logo_dir, company_logo_filename)
-
-        with open(logo_path, "wb") as f:
-            f.write(company_logo.file.read())
+    company_logo_filename = _save_company_logo(company_logo)
 
     # ---------------------------------------------------------
-    # 2) LOAD XLSX
+    # 2) PROCESS WORKBOOK
     # ---------------------------------------------------------
-    file_bytes = io.BytesIO(file.file.read())
-    wb = load_workbook(file_bytes)
-    sheet = wb["sheet1"] if "sheet1" in wb.sheetnames else wb[wb.sheetnames[0]]
-
-    df = pd.DataFrame(sheet.values)
-    df.columns = [str(c).strip() for c in df.iloc[0]]
-    df = df[1:]
-    df = df.dropna(subset=["Jewelry Description", "Style Number"], how="all")
-    df = df[df["Jewelry Description"].astype(str).str.strip() != ""]
-    df = df.reset_index(drop=True)
-
-    # remove rows containing (mandatory)
-    df = df[~df.apply(lambda row: row.astype(str).str.contains(r"\(mandatory\)", case=False, na=False).any(), axis=1)]
-    df = df.reset_index(drop=True)
-
-    normalized_cols = {col.lower().strip(): col for col in df.columns}
-
-    # ---------------------------------------------------------
-    # 3) START PROCESSING ROWS
-    # ---------------------------------------------------------
-    reports = []
-    skipped = []
-
-    diamond_type_used = diamond_type.strip() if diamond_type else None
-
-    for idx, row in df.iterrows():
-
-        style = str(row.get("Style Number", "")).strip()
-        if not style:
-            continue
-
-        # skip duplicates
-        existing = db.query(Report).filter(Report.style_number == style).first()
-        if existing:
-            skipped.append(style)
-            continue
+    return ingest_workbook(
+        db,
+        file.file,
+        company_logo_filename=company_logo_filename,
+        diamond_type=diamond_type,
+        comment=comment,
+        isecopy=isecopy,
+        notice_image=notice_image,
+        igi_logo=igi_logo,
+    )
 
-        # comment field
-        comment_val = comment.strip() if comment else None
-        if not comment_val and "comment" in normalized_cols:
-            col_name = normalized_cols["comment"]
-            txt = str(row.get(col_name, "")).strip()
-            if txt:
-                comment_val = txt
 
-        # diamond numbers
-        try:
-            num_diamonds_int = int(float(str(row.get("No Of Diamonds", 0)).strip()))
-        except:
-            num_diamonds_int = 0
-
-        num_in_words = (
-            num2words(num_diamonds_int, to="cardinal")
-            .replace("-", " ")
-            .capitalize()
-        )
+# ==========================================================
+# Upload XLSX as a background job
+# ==========================================================
+@router.post("/upload-xlsx/jobs", status_code=202)
+def create_upload_xlsx_job(
+    file: UploadFile = File(...),
+    company_logo: UploadFile = File(None),
+    diamond_type: Optional[str] = Form(None),
+    comment: Optional[str] = Form(None),
+    isecopy: bool = Form(False),
+    notice_image: bool = Form(False),
+    igi_logo: bool = Form(False),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Same form as /reports/upload-xlsx, but returns a job id right away."""
+    job_id = str(uuid.uuid4())
+    os.makedirs(INGEST_JOB_DIR, exist_ok=True)
+    workbook_path = os.path.join(INGEST_JOB_DIR, f"{job_id}.xlsx")
+    with open(workbook_path, "wb") as f:
+        shutil.copyfileobj(file.file, f)
+
+    params = {
+        "company_logo_filename": _save_company_logo(company_logo),
+        "diamond_type": diamond_type,
+        "comment": comment,
+        "isecopy": isecopy,
+        "notice_image": notice_image,
+        "igi_logo": igi_logo,
+    }
+    job = IngestJob(id=job_id, status="queued", workbook_path=workbook_path, params=json.dumps(params))
+    db.add(job)
+    db.commit()
 
-        diamonds_phrase = diamond_type_used if diamond_type_used else "Natural Diamonds"
+    enqueue_ingest_job(job_id)
+    return {"job_id": job_id, "status": "queued"}
 
-        jewel_desc = str(row.get("Jewelry Description", "")).strip()
 
-        # auto convert earrings
-        if jewel_desc.lower() in ["earring", "ear rings", "ear-ring", "ear-rings"]:
-            jewel_desc = "pair of earrings"
+@router.get("/upload-xlsx/jobs/{job_id}")
+def get_upload_xlsx_job(job_id: str, db: Session = Depends(get_db)):
+    """Progress (rows done/skipped/failed) and, once finished, the upload-xlsx result."""
+    job = db.get(IngestJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(job)
 
-        desc = (
-            f"One {row.get('Metal Color', '')} {jewel_desc}, "
-            f"weighing in total {row.get('Gross Weight', '')}g, containing, "
-            f"{num_in_words} ({num_diamonds_int}) {diamonds_phrase}"
-        )
 
-        shape = f"({num_diamonds_int}) {row.get('Shape', '')} Brilliant"
-        # tot = str(row.get("Diamond Weight", "")).strip()
-        
-        tot_raw = row.get("Diamond Weight", "")
-        if tot_raw not in [None, ""]:
-            try:
-                carat_value = float(tot_raw)
-                tot = f"{carat_value:.2f}"
-            except ValueError:
-                tot = str(tot_raw).strip()  # fallback if invalid value
-        else:
-            tot = ""
-            
-        color = row.get("Color Criteria", "")
-        clarity = row.get("Clarity Criteria", "")
-        report_no = gen_report_no()
-
-        # igi_logo (priority: form → column)
-        igi_logo_val = bool(igi_logo)
-        if not igi_logo_val:
-            for key in ["igi_logo", "igi logo", "igi-logo"]:
-                if key in normalized_cols:
-                    val = row.get(normalized_cols[key])
-                    if val:
-                        igi_logo_val = str(val).strip().lower() in ["true", "1", "yes", "y"]
-                    break
-
-        # ---------------------------------------------------------
-        # ⭐ 4) NEW FIX: GET IMAGE BY ANCHOR ROW
-        # ---------------------------------------------------------
-        excel_row = idx + 2  # Sheet row (header row is 1)
-        img = extract_image_by_row(sheet, excel_row)
-
-        image_filename = None
-        if img:
-            safe_style = style.replace(" ", "_")
-            image_filename = f"{safe_style}.png"
-            img_path = os.path.join(UPLOAD_DIR, image_filename)
+# ==========================================================
+# List Reports
+# ==========================================================
+def _list_item(r: Report) -> dict:
+    return {"report_no": r.report_no, "style_number": r.style_number}
 
-            try:
-                img.convert("RGBA").save(img_path, format="PNG", optimize=True)
-            except:
-                img.save(img_path, format="PNG")
-
-        # ---------------------------------------------------------
-        # 5) SAVE REPORT
-        # ---------------------------------------------------------
-        new_report = Report(
-            report_no=report_no,
-            description=desc,
-            shape_and_cut=shape,
-            tot_est_weight=tot,
-            color=color,
-            clarity=clarity,
-            style_number=style,
-            image_filename=image_filename,
-            company_logo=company_logo_filename,
-            comment=comment_val,
-            notice_image=notice_image,
-            isecopy=isecopy,
-            igi_logo=igi_logo_val,
-        )
 
-        db.add(new_report)
-        db.commit()
-        db.refresh(new_report)
+def _iter_all_reports(q: Optional[str], count: str) -> Iterator[bytes]:
+    """
+    ALL RECORDS MODE body, written as the rows come off a server-side cursor
+    so the table is never held in memory. Uses its own session because the
+    request's session is closed before a streaming body is consumed.
+    """
+    db = SessionLocal()
+    try:
+        query = db.query(Report.report_no, Report.style_number)
+        rank = None
+        if q:
+            match, rank = search_terms(q)
+            query = query.filter(match)
+        total = count_rows(db, query, count)
+
+        head = {"page": 1, "size": total, "total": total, "next_cursor": None}
+        yield json.dumps(head)[:-1].encode("utf-8") + b', "items": ['
+        rows = newest_first(query, rank).yield_per(LIST_STREAM_BATCH_SIZE)
+        for i, r in enumerate(rows):
+            item = json.dumps(_list_item(r))
+            yield (item if i == 0 else ", " + item).encode("utf-8")
+        yield b"]}"
+    finally:
+        db.close()
 
-        reports.append(new_report)
 
-    # ---------------------------------------------------------
-    # 6) RETURN
-    # ---------------------------------------------------------
-    return {
-        "uploaded": [ReportOut.model_validate(r) for r in reports],
-        "skipped": skipped,
-        "msg": f"{len(reports)} reports uploaded, {len(skipped)} skipped"
-    }
-# ==========================================================
-# List Reports
-# ==========================================================
 @router.get("/", response_model=Dict[str, object])
 def list_reports(
-    q: Optional[str] = Query(None, description="Search report_no; partial match allowed"),
+    request: Request,
+    q: Optional[str] = Query(None, description="Search report_no / style_number; partial match allowed"),
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=-1),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page; overrides page"),
+    count: str = Query("exact", pattern="^(exact|estimate|none)$", description="How total is computed"),
     db: Session = Depends(get_db),
 ):
-    query = db.query(Report)
-
-    if q:
-        query = query.filter(Report.report_no.ilike(f"%{q}%"))
-
-    total = query.count()
-
     if size <= 0:
         # 🔥 ALL RECORDS MODE
-        items = query.order_by(Report.created_at.desc()).all()
-        actual_size = total
+        return StreamingResponse(_iter_all_reports(q, count), media_type="application/json")
+
+    rank = None
+    if q:
+        # exact and prefix matches first
+        match, rank = search_terms(q)
+        query = db.query(Report, rank).filter(match)
     else:
-        items = (
-            query.order_by(Report.created_at.desc())
-            .offset((page - 1) * size)
-            .limit(size)
-            .all()
-        )
-        actual_size = size
+        query = db.query(Report)
 
-    return {
+    total = count_rows(db, query, count)
+    query = newest_first(query, rank)
+
+    if cursor:
+        try:
+            query = after_cursor(query, cursor, rank)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    elif page > 1:
+        # page numbers still work, but cost grows with depth; follow next_cursor instead
+        query = query.offset((page - 1) * size)
+
+    # one extra row tells whether there is a next page
+    rows = query.limit(size + 1).all()
+    if rank is None:
+        rows = [(r, None) for r in rows]
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        last, last_rank = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id, last_rank)
+    items = [r for r, _ in rows]
+
+    prepared = prepare_json({
         "page": page,
-        "size": actual_size,
+        "size": size,
         "total": total,
-        "items": [
-            {"report_no": r.report_no, "style_number": r.style_number}
-            for r in items
-        ],
-    }
+        "next_cursor": next_cursor,
+        "items": [_list_item(r) for r in items],
+    })
+    return conditional_json(request, prepared, PRIVATE_CACHE_CONTROL)
+
+
+# ==========================================================
+# Batch Card Export
+# ==========================================================
+def _card_export_query(db: Session, req: CardExportRequest, report_nos: Optional[List[str]] = None):
+    query = db.query(Report)
+    if report_nos is not None:
+        query = query.filter(Report.report_no.in_(report_nos))
+    if req.style_number:
+        query = query.filter(Report.style_number == req.style_number)
+    if req.created_from:
+        query = query.filter(created_key(query) >= created_value(query, req.created_from))
+    if req.created_to:
+        query = query.filter(created_key(query) < created_value(query, req.created_to))
+    return query.order_by(Report.created_at.asc(), Report.id.asc())
+
+
+def _iter_card_export_reports(db: Session, req: CardExportRequest) -> Iterator[Report]:
+    if not req.report_no:
+        yield from _card_export_query(db, req).yield_per(LIST_STREAM_BATCH_SIZE)
+        return
+    unique_nos = list(dict.fromkeys(req.report_no))
+    for start in range(0, len(unique_nos), LOOKUP_CHUNK_SIZE):
+        yield from _card_export_query(db, req, unique_nos[start:start + LOOKUP_CHUNK_SIZE])
+
+
+def _iter_card_zip(req: CardExportRequest) -> Iterator[bytes]:
+    """
+    Zip of <report_no>.png cards, sent as each card is rendered. Own session,
+    as the request's is closed before a streaming body is consumed.
+    """
+    db = SessionLocal()
+    try:
+        sink = ZipChunkSink()
+        failed = []
+        with zipfile.ZipFile(sink, mode="w") as zf:
+            for report_no, data, error in iter_rendered_cards(_iter_card_export_reports(db, req)):
+                if data is None:
+                    failed.append(f"{report_no}: {error}")
+                    continue
+                # PNG is already compressed
+                zf.writestr(zipfile.ZipInfo(f"{report_no}.png"), data, compress_type=zipfile.ZIP_STORED)
+                yield sink.drain()
+            if failed:
+                zf.writestr("errors.txt", "\n".join(failed) + "\n")
+        yield sink.drain()
+    finally:
+        db.close()
+
+
+@router.post("/cards/export")
+def export_cards(req: CardExportRequest, db: Session = Depends(get_db)):
+    """
+    Card PNGs for many reports as one zip: pass report numbers, a style number
+    and/or a created-at range (created_from inclusive, created_to exclusive).
+    Cards are rendered in the process pool and streamed out as they finish.
+    """
+    if not (req.report_no or req.style_number or req.created_from or req.created_to):
+        raise HTTPException(status_code=400, detail="Give report_no, style_number or a created_at range")
+    for field in ("created_from", "created_to"):
+        value = getattr(req, field)
+        if value is not None:
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            setattr(req, field, value.astimezone(timezone.utc))
+
+    # fail before the 200 is sent if nothing matches
+    if next(_iter_card_export_reports(db, req), None) is None:
+        raise HTTPException(status_code=404, detail="No reports match")
+
+    now_str = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    return StreamingResponse(
+        _iter_card_zip(req),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="report_cards_{now_str}.zip"'},
+    )
 
 
 # ==========================================================
@@ -569,65 +812,44 @@ async def update_report(
 
     db: Session = Depends(get_db),
 ):
-    report = db.query(Report).filter(Report.report_no == report_no).first()
-    if not report:
+    # validate uploads before touching anything
+    image_ext = logo_ext = None
+    if image:
+        image_ext = image.filename.split(".")[-1].lower()
+        if image_ext not in ["png", "jpg", "jpeg", "webp"]:
+            raise HTTPException(400, "image must be PNG/JPG/JPEG/WEBP")
+    if company_logo:
+        logo_ext = company_logo.filename.split(".")[-1].lower()
+        if logo_ext not in ["png", "jpg", "jpeg", "webp"]:
+            raise HTTPException(400, "company_logo must be PNG/JPG/JPEG/WEBP")
+
+    exists = await run_blocking(
+        lambda: db.query(Report.id).filter(Report.report_no == report_no).first() is not None
+    )
+    if not exists:
         raise HTTPException(status_code=404, detail="Report not found")
 
     # ------------------------------
     # UPDATE NORMAL REPORT IMAGE (replace)
     # ------------------------------
+    new_filename = None
     if image:
-        ext = image.filename.split(".")[-1].lower()
-        if ext not in ["png", "jpg", "jpeg", "webp"]:
-            raise HTTPException(400, "image must be PNG/JPG/JPEG/WEBP")
-
-        # delete old image
-        if report.image_filename:
-            old = os.path.join(UPLOAD_DIR, report.image_filename)
-            if os.path.exists(old):
-                try:
-                    os.remove(old)
-                except:
-                    pass
-
-        new_filename = f"{report_no}_image.{ext}"
-        new_path = os.path.join(UPLOAD_DIR, new_filename)
-
-        content = await image.read()
-        with open(new_path, "wb") as f:
-            f.write(content)
-
-        report.image_filename = new_filename
+        new_filename = f"{report_no}_image.{image_ext}"
+        tmp_path = new_temp_path()
+        await save_upload(image, tmp_path)
+        await run_blocking(store_upload, tmp_path, new_filename)
+        try:
+            await run_heavy(render_variants_for, new_filename)
+        except Exception as e:
+            # served image is saved; variants get rendered on first request instead
+            print(f"⚠️ Could not render variants of {new_filename}: {e}")
 
     # --------------------------
     # UPDATE COMPANY LOGO
     # --------------------------
+    new_logo_filename = None
     if company_logo:
-        ext = company_logo.filename.split(".")[-1].lower()
-        if ext not in ["png", "jpg", "jpeg", "webp"]:
-            raise HTTPException(400, "company_logo must be PNG/JPG/JPEG/WEBP")
-
-        logo_dir = os.path.join(UPLOAD_DIR, "logo")
-        os.makedirs(logo_dir, exist_ok=True)
-
-        # delete old company logo file (if exists)
-        if report.company_logo:
-            old_path = os.path.join(logo_dir, report.company_logo)
-            if os.path.exists(old_path):
-                try:
-                    os.remove(old_path)
-                except:
-                    pass
-
-        new_logo_filename = f"company_logo_{report_no}_{int(datetime.utcnow().timestamp())}.{ext}"
-        new_logo_path = os.path.join(logo_dir, new_logo_filename)
-
-        content = await company_logo.read()
-        with open(new_logo_path, "wb") as f:
-            f.write(content)
-
-        # update DB field
-        report.company_logo = new_logo_filename
+        new_logo_filename = await run_blocking(_store_company_logo, company_logo.file, logo_ext)
 
     # --------------------------
     # UPDATE OTHER FIELDS
@@ -646,12 +868,42 @@ async def update_report(
         "igi_logo": igi_logo,
     }
 
+    return await run_blocking(_apply_report_update, db, report_no, fields, new_filename, new_logo_filename)
+
+
+def _apply_report_update(
+    db: Session,
+    report_no: str,
+    fields: Dict[str, object],
+    new_filename: Optional[str],
+    new_logo_filename: Optional[str],
+) -> dict:
+    """DB half of update_report; runs in the I/O pool."""
+    report = db.query(Report).filter(Report.report_no == report_no).first()
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+
+    replaced_images, replaced_logos = [], []
+    if new_filename:
+        if report.image_filename and report.image_filename != new_filename:
+            replaced_images.append(report.image_filename)
+        report.image_filename = new_filename
+    if new_logo_filename:
+        if report.company_logo:
+            replaced_logos.append(report.company_logo)
+        # update DB field
+        report.company_logo = new_logo_filename
+
     for key, value in fields.items():
         if value is not None:
             setattr(report, key, value)
 
     db.commit()
     db.refresh(report)
+    invalidate_public_reports([report_no])
+
+    # old files go once the commit is done, unless another report still uses them
+    schedule_file_removal(unreferenced_files(db, replaced_images, replaced_logos))
 
     return {
         "msg": "Report updated successfully",
@@ -670,24 +922,14 @@ def delete_report(report_no: str, db: Session = Depends(get_db)):
     report = db.query(Report).filter(Report.report_no == report_no).first()
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
-    if report.image_filename:
-        img_path = os.path.join(UPLOAD_DIR, report.image_filename)
-        if os.path.exists(img_path):
-            try:
-                os.remove(img_path)
-            except Exception:
-                pass
-    # delete company logo file (if exists)
-    if report.company_logo:
-        logo_path = os.path.join(UPLOAD_DIR, "logo", report.company_logo)
-        if os.path.exists(logo_path):
-            try:
-                os.remove(logo_path)
-            except Exception:
-                pass
+    image_filename, company_logo = report.image_filename, report.company_logo
 
     db.delete(report)
     db.commit()
+    invalidate_public_reports([report_no])
+
+    # image / company logo go after the commit, unless another report shares them
+    schedule_file_removal(unreferenced_files(db, [image_filename], [company_logo]))
     return {"msg": f"Report {report_no} deleted"}
 
 
@@ -702,50 +944,44 @@ def batch_delete_reports(
 ):
     report_nos = payload.report_no  # <-- singular key from schema
 
-    deleted_count = 0
+    deleted = []
     failed = []
-
-    for report_no in report_nos:
+    images, logos = [], []
+
+    # one DELETE ... RETURNING per chunk; each chunk in a savepoint so a bad chunk
+    # is reported as failed without undoing the others
+    unique_nos = list(dict.fromkeys(report_nos))
+    for start in range(0, len(unique_nos), BATCH_DELETE_CHUNK_SIZE):
+        chunk = unique_nos[start:start + BATCH_DELETE_CHUNK_SIZE]
+        stmt = (
+            delete(Report)
+            .where(Report.report_no.in_(chunk))
+            .returning(Report.report_no, Report.image_filename, Report.company_logo)
+            .execution_options(synchronize_session=False)
+        )
         try:
-            report = (
-                db.query(Report)
-                .filter(Report.report_no == report_no)
-                .first()
-            )
-
-            if not report:
-                failed.append({"report_no": report_no, "error": "Not found"})
-                continue
-
-            # Delete image file
-            if report.image_filename:
-                img_path = os.path.join(UPLOAD_DIR, report.image_filename)
-                if os.path.exists(img_path):
-                    try:
-                        os.remove(img_path)
-                    except Exception:
-                        pass
-
-            # Delete company logo
-            if report.company_logo:
-                logo_path = os.path.join(UPLOAD_DIR, "logo", report.company_logo)
-                if os.path.exists(logo_path):
-                    try:
-                        os.remove(logo_path)
-                    except Exception:
-                        pass
-
-            db.delete(report)
-            deleted_count += 1
-
+            with db.begin_nested():
+                rows = db.execute(stmt).all()
         except Exception as e:
-            failed.append({"report_no": report_no, "error": str(e)})
+            failed.extend({"report_no": no, "error": str(getattr(e, "orig", e))} for no in chunk)
+            continue
+
+        for report_no, image_filename, company_logo in rows:
+            deleted.append(report_no)
+            images.append(image_filename)
+            logos.append(company_logo)
+        found = {row[0] for row in rows}
+        failed.extend({"report_no": no, "error": "Not found"} for no in chunk if no not in found)
 
     db.commit()
+    invalidate_public_reports(deleted)
+
+    # files go after the commit, and only those no other report still uses
+    schedule_file_removal(unreferenced_files(db, images, logos))
 
     return {
         "msg": "Batch delete completed",
-        "deleted": deleted_count,
+        "deleted": len(deleted),
         "failed": failed,
         "total": len(report_nos),
     }
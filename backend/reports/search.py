@@ -0,0 +1,33 @@
+from typing import Tuple
+
+from sqlalchemy import case, func, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+from models import Report
+
+SEARCH_COLUMNS = (Report.report_no, Report.style_number)
+
+
+def escape_like(term: str) -> str:
+    """Make %, _ and the escape char match literally inside a LIKE pattern."""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_terms(q: str) -> Tuple[ColumnElement, ColumnElement]:
+    """
+    (filter, rank) for a report search over report_no and style_number.
+
+    The filter is ILIKE '%q%' per column, which PostgreSQL answers from the
+    gin_trgm_ops indexes (for terms of 3+ characters) and SQLite by a scan.
+    rank is 0 for an exact match, 1 for a prefix match and 2 otherwise, on
+    whichever column matches best.
+    """
+    term = q.strip()
+    pattern = escape_like(term)
+    lowered = term.lower()
+
+    matches = [col.ilike(f"%{pattern}%", escape="\\") for col in SEARCH_COLUMNS]
+    exact = or_(*[func.lower(col) == lowered for col in SEARCH_COLUMNS])
+    prefix = or_(*[col.ilike(f"{pattern}%", escape="\\") for col in SEARCH_COLUMNS])
+    rank = case((exact, 0), (prefix, 1), else_=2)
+    return or_(*matches), rank
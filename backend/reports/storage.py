@@ -0,0 +1,336 @@
+import argparse
+import hashlib
+import os
+import shutil
+import time
+import uuid
+from typing import Iterator, List, Optional, Tuple
+
+from starlette.staticfiles import StaticFiles
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./uploads")
+
+# Content-addressed store: blobs/<first 2 hex>/<sha256>. Every public upload name
+# (uploads/<name>, logo/<name>, pdfs/<name>) is a hard link to one of these, so
+# identical content is stored once and a blob's link count is its reference count.
+BLOB_DIR = os.path.join(UPLOAD_DIR, "blobs")
+BLOB_TMP_DIR = os.path.join(BLOB_DIR, "tmp")
+STORE_CHUNK_SIZE = 1024 * 1024
+
+
+# ==========================================================
+# Sharded upload names
+# ==========================================================
+# Public upload names live two hashed levels down, e.g. uploads/logo/3f/a2/<name>,
+# instead of in one flat directory. The level names come from the file name
+# itself, so the stored filenames (and /uploads/<name> URLs) do not change.
+UPLOAD_FOLDERS = ("", "logo", "pdfs")
+# Internal folders under UPLOAD_DIR that are never served or treated as uploads.
+INTERNAL_FOLDERS = ("blobs", "jobs", "variants", "cards", ".quarantine")
+
+
+def shard_dir(name: str) -> str:
+    h = hashlib.sha1(name.encode("utf-8")).hexdigest()
+    return os.path.join(h[:2], h[2:4])
+
+
+def upload_path(name: str, folder: str = "", root: str = UPLOAD_DIR) -> str:
+    """Where a new upload called `name` is written."""
+    return os.path.join(root, folder, shard_dir(name), name)
+
+
+def legacy_upload_path(name: str, folder: str = "", root: str = UPLOAD_DIR) -> str:
+    """Flat location used before sharding."""
+    return os.path.join(root, folder, name)
+
+
+def resolve_upload(name: str, folder: str = "", root: str = UPLOAD_DIR) -> str:
+    """Existing file for a stored name: sharded first, then the flat legacy location."""
+    path = upload_path(name, folder, root)
+    if os.path.exists(path):
+        return path
+    legacy = legacy_upload_path(name, folder, root)
+    if os.path.exists(legacy):
+        return legacy
+    return path
+
+
+def existing_upload_paths(name: str, folder: str = "") -> List[str]:
+    """Every copy of a stored name on disk (a file may sit in both layouts mid-migration)."""
+    return [p for p in (upload_path(name, folder), legacy_upload_path(name, folder)) if os.path.exists(p)]
+
+
+def _is_shard_level(name: str) -> bool:
+    return len(name) == 2 and all(c in "0123456789abcdef" for c in name)
+
+
+def iter_upload_files(folder: str = "", root: str = UPLOAD_DIR) -> Iterator[os.DirEntry]:
+    """Files of one upload folder in both layouts (flat legacy files, then shards)."""
+    base = os.path.join(root, folder)
+    if not os.path.isdir(base):
+        return
+    shards = []
+    with os.scandir(base) as it:
+        for entry in it:
+            if entry.name.startswith("."):
+                continue
+            if entry.is_file(follow_symlinks=False):
+                yield entry
+            elif entry.is_dir(follow_symlinks=False) and _is_shard_level(entry.name):
+                shards.append(entry.path)
+    for level1 in shards:
+        with os.scandir(level1) as it:
+            level2 = [e.path for e in it if e.is_dir(follow_symlinks=False) and _is_shard_level(e.name)]
+        for path in level2:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if not entry.name.startswith(".") and entry.is_file(follow_symlinks=False):
+                        yield entry
+
+
+def migrate_to_shards(dry_run: bool = False) -> int:
+    """
+    Move flat legacy uploads into the sharded layout. Safe while the app runs:
+    the sharded name is linked before the flat one is removed, and resolve_upload
+    finds the file in either place throughout.
+    """
+    moved = 0
+    for folder in UPLOAD_FOLDERS:
+        base = os.path.join(UPLOAD_DIR, folder)
+        if not os.path.isdir(base):
+            continue
+        with os.scandir(base) as it:
+            flat = [e for e in it if e.is_file(follow_symlinks=False) and not e.name.startswith(".")]
+        for entry in flat:
+            if entry.name.endswith(".tmp"):
+                continue
+            moved += 1
+            if dry_run:
+                continue
+            dest = upload_path(entry.name, folder)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            try:
+                if not os.path.exists(dest):
+                    try:
+                        os.link(entry.path, dest)
+                    except OSError:
+                        os.replace(entry.path, dest)
+                        continue
+                # a sharded copy exists (linked above, or written since): the flat one is redundant
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+    return moved
+
+
+def store_upload(tmp_path: str, name: str, folder: str = "", digest: Optional[str] = None) -> str:
+    """store_file() into the sharded location for `name`, dropping any flat legacy copy."""
+    digest = store_file(tmp_path, upload_path(name, folder), digest)
+    legacy = legacy_upload_path(name, folder)
+    if os.path.isfile(legacy):
+        os.remove(legacy)
+    return digest
+
+
+def store_upload_fileobj(fileobj, name: str, folder: str = "") -> str:
+    tmp_path, digest = spool_to_temp(fileobj)
+    return store_upload(tmp_path, name, folder, digest)
+
+
+class ShardedStaticFiles(StaticFiles):
+    """
+    StaticFiles for the uploads mount: /uploads/<name>, /uploads/logo/<name> and
+    /uploads/pdfs/<name> are looked up in their shard first, then flat. Internal
+    folders (blobs, jobs, caches, quarantine) are not served.
+    """
+
+    def lookup_path(self, path: str) -> Tuple[str, Optional[os.stat_result]]:
+        parts = path.replace("\\", "/").split("/")
+        if parts[0] in INTERNAL_FOLDERS:
+            return "", None
+        folder, name = "/".join(parts[:-1]), parts[-1]
+        if name and folder in UPLOAD_FOLDERS:
+            full_path, stat_result = super().lookup_path(os.path.join(folder, shard_dir(name), name))
+            if stat_result is not None:
+                return full_path, stat_result
+        return super().lookup_path(path)
+
+
+def blob_path(digest: str) -> str:
+    return os.path.join(BLOB_DIR, digest[:2], digest)
+
+
+def new_temp_path(suffix: str = "") -> str:
+    """A fresh path on the blob store's filesystem, for writing content before store_file()."""
+    os.makedirs(BLOB_TMP_DIR, exist_ok=True)
+    return os.path.join(BLOB_TMP_DIR, uuid.uuid4().hex + suffix)
+
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(STORE_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _place(src: str, dest_path: str):
+    """
+    Atomically make dest_path a hard link to src (a copy where links are not supported).
+    The link is made even when dest_path already points at src, so the name's ctime
+    always records the latest store (reports/cleanup.py relies on that).
+    """
+    os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+    staging = f"{dest_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        os.link(src, staging)
+    except OSError:
+        shutil.copyfile(src, staging)
+    try:
+        os.replace(staging, dest_path)
+    except OSError:
+        os.remove(staging)
+        raise
+    if os.path.lexists(staging):
+        # rename() is a no-op when both names are links to the same file
+        os.remove(staging)
+
+
+def store_file(tmp_path: str, dest_path: str, digest: Optional[str] = None) -> str:
+    """
+    Move a freshly written file into the blob store and expose it as dest_path.
+    If the content is already stored, the new copy is dropped and dest_path links
+    to the existing blob. Returns the content's sha256.
+    """
+    digest = digest or file_digest(tmp_path)
+    blob = blob_path(digest)
+    os.makedirs(os.path.dirname(blob), exist_ok=True)
+    if os.path.exists(blob):
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, blob)
+    _place(blob, dest_path)
+    return digest
+
+
+def spool_to_temp(fileobj) -> Tuple[str, str]:
+    """Copy a readable file object to a new temp path, hashing on the way: (tmp_path, sha256)."""
+    tmp_path = new_temp_path()
+    h = hashlib.sha256()
+    try:
+        with open(tmp_path, "wb") as out:
+            for chunk in iter(lambda: fileobj.read(STORE_CHUNK_SIZE), b""):
+                h.update(chunk)
+                out.write(chunk)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return tmp_path, h.hexdigest()
+
+
+def store_fileobj(fileobj, dest_path: str) -> str:
+    """store_file() for a readable file object (e.g. an upload or a zip member)."""
+    tmp_path, digest = spool_to_temp(fileobj)
+    return store_file(tmp_path, dest_path, digest)
+
+
+def blob_refcount(digest: str) -> int:
+    """How many public names currently point at this blob."""
+    try:
+        return os.stat(blob_path(digest)).st_nlink - 1
+    except FileNotFoundError:
+        return 0
+
+
+def prune_blobs(min_age: float = 0, dry_run: bool = False) -> int:
+    """
+    Remove blobs no public name links to any more (and stale temp files).
+    Deleting a report only unlinks its names, so this is what frees the space.
+    """
+    cutoff = time.time() - min_age
+    removed = 0
+    if not os.path.isdir(BLOB_DIR):
+        return 0
+    for shard in os.scandir(BLOB_DIR):
+        if not shard.is_dir(follow_symlinks=False):
+            continue
+        for entry in os.scandir(shard.path):
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            st = entry.stat(follow_symlinks=False)
+            # ctime moves whenever a link is added, so a blob just reused is left alone
+            if st.st_ctime > cutoff:
+                continue
+            # tmp/ holds writes that never made it into the store
+            if shard.name == "tmp" or st.st_nlink <= 1:
+                removed += 1
+                if not dry_run:
+                    try:
+                        os.remove(entry.path)
+                    except FileNotFoundError:
+                        pass
+    return removed
+
+
+def trim_lru(directory: str, max_bytes: int) -> int:
+    """
+    Size cap for a cache directory: delete the least recently used files (oldest
+    mtime; readers touch what they serve) until it is under 90% of max_bytes.
+    Returns how many files were removed.
+    """
+    entries = []
+    total = 0
+    for dirpath, _, filenames in os.walk(directory):
+        for fn in filenames:
+            path = os.path.join(dirpath, fn)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+    if total <= max_bytes:
+        return 0
+    entries.sort()
+    removed = 0
+    target = max_bytes * 0.9
+    for _, size, path in entries:
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        total -= size
+    return removed
+
+
+def adopt_file(path: str) -> bool:
+    """
+    Move a file written before the blob store existed into it, keeping its name.
+    Returns False if it already is a link to a stored blob.
+    """
+    if os.stat(path).st_nlink > 1:
+        return False
+    tmp_path = new_temp_path()
+    shutil.copyfile(path, tmp_path)
+    store_file(tmp_path, path)
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m reports.storage", description="Upload storage maintenance.")
+    parser.add_argument("--migrate-shards", action="store_true", help="move flat uploads into the sharded layout")
+    parser.add_argument("--dry-run", action="store_true", help="only count what would be moved")
+    args = parser.parse_args(argv)
+    if args.migrate_shards:
+        n = migrate_to_shards(dry_run=args.dry_run)
+        print(f"📦 {n} files {'would be moved' if args.dry_run else 'moved'} into shards")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
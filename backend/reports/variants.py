@@ -0,0 +1,116 @@
+import os
+import threading
+import uuid
+from typing import Dict, Iterable, Optional
+
+from PIL import Image
+
+from reports.storage import UPLOAD_DIR, resolve_upload, shard_dir, trim_lru
+
+# Derivatives of product images: longest side in px (None = original size).
+VARIANT_SIZES: Dict[str, Optional[int]] = {"thumb": 160, "card": 480, "full": None}
+VARIANT_FORMATS = ("webp", "png")
+VARIANT_WEBP_QUALITY = int(os.getenv("VARIANT_WEBP_QUALITY", "82"))
+# Rendered variants are a cache: least recently served ones are evicted past this size.
+VARIANT_CACHE_MAX_BYTES = int(os.getenv("VARIANT_CACHE_MAX_MB", "1024")) * 1024 * 1024
+VARIANT_DIR = os.path.join(UPLOAD_DIR, "variants")
+
+_locks = [threading.Lock() for _ in range(16)]
+_size_lock = threading.Lock()
+_written_since_check = VARIANT_CACHE_MAX_BYTES  # forces a scan on first write
+
+
+def variant_urls(image_filename: Optional[str]) -> Optional[Dict[str, Dict[str, str]]]:
+    """{"thumb": {"webp": url, "png": url}, ...}; full PNG is the original upload."""
+    if not image_filename:
+        return None
+    urls = {
+        variant: {fmt: f"/image-variants/{variant}/{fmt}/{image_filename}" for fmt in VARIANT_FORMATS}
+        for variant in VARIANT_SIZES
+    }
+    urls["full"]["png"] = f"/uploads/{image_filename}"
+    return urls
+
+
+def variant_path(name: str, variant: str, fmt: str) -> str:
+    return os.path.join(VARIANT_DIR, shard_dir(name), name, f"{variant}.{fmt}")
+
+
+def _render(img: Image.Image, variant: str, fmt: str, dest: str) -> int:
+    size = VARIANT_SIZES[variant]
+    out = img.copy()
+    if size:
+        out.thumbnail((size, size), Image.LANCZOS)
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = f"{dest}.{uuid.uuid4().hex}.tmp"
+    if fmt == "webp":
+        out.save(tmp, format="WEBP", quality=VARIANT_WEBP_QUALITY, method=4)
+    else:
+        out.save(tmp, format="PNG", optimize=True)
+    os.replace(tmp, dest)
+    return os.path.getsize(dest)
+
+
+def render_variants(img: Image.Image, name: str, variants: Iterable[str] = VARIANT_SIZES) -> int:
+    """Write every variant of an image that was just saved as `name`; returns bytes written."""
+    img = img.convert("RGBA")
+    written = 0
+    for variant in variants:
+        for fmt in VARIANT_FORMATS:
+            if variant == "full" and fmt == "png":
+                continue  # served straight from /uploads
+            written += _render(img, variant, fmt, variant_path(name, variant, fmt))
+    return written
+
+
+def render_variants_for(name: str) -> int:
+    """render_variants() for an upload already on disk (e.g. a replaced report image)."""
+    source = resolve_upload(name)
+    with Image.open(source) as img:
+        written = render_variants(img, name)
+    _account(written)
+    return written
+
+
+def ensure_variant(name: str, variant: str, fmt: str) -> Optional[str]:
+    """
+    Path of a variant, rendering it on first request (or when the source changed
+    since it was rendered). None when the source image does not exist.
+    """
+    source = resolve_upload(name)
+    try:
+        # ctime moves whenever the name is (re)linked to different content
+        source_changed = os.stat(source).st_ctime
+    except FileNotFoundError:
+        return None
+    if variant == "full" and fmt == "png":
+        return source
+
+    dest = variant_path(name, variant, fmt)
+    with _locks[hash(dest) % len(_locks)]:
+        try:
+            if os.stat(dest).st_mtime >= source_changed:
+                os.utime(dest)  # recency for LRU eviction
+                return dest
+        except FileNotFoundError:
+            pass
+        with Image.open(source) as img:
+            written = _render(img.convert("RGBA"), variant, fmt, dest)
+    _account(written)
+    return dest
+
+
+def _account(written: int):
+    global _written_since_check
+    with _size_lock:
+        _written_since_check += written
+        due = _written_since_check >= VARIANT_CACHE_MAX_BYTES // 20
+        if due:
+            _written_since_check = 0
+    if due:
+        enforce_variant_cache_limit()
+
+
+def enforce_variant_cache_limit(max_bytes: int = VARIANT_CACHE_MAX_BYTES) -> int:
+    """Evict least recently served variants until the cache is under 90% of max_bytes."""
+    return trim_lru(VARIANT_DIR, max_bytes)
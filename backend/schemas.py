@@ -1,7 +1,9 @@
-from typing import Optional, List, Annotated
-from pydantic import BaseModel, ConfigDict, EmailStr, SecretStr, Field, StringConstraints
+from typing import Optional, List, Annotated, Dict
+from pydantic import BaseModel, ConfigDict, EmailStr, SecretStr, Field, StringConstraints, computed_field
 from datetime import datetime
 
+from reports.variants import variant_urls
+
 BaseConfig = ConfigDict(
     from_attributes=True,
     serialize_by_alias=True,
@@ -38,6 +40,12 @@ class ReportOut(BaseModel):
     igi_logo: bool = False
     created_at: Optional[datetime] = None
 
+    @computed_field
+    @property
+    def image_variants(self) -> Optional[Dict[str, Dict[str, str]]]:
+        """URLs of the thumb/card/full image in webp and png (see reports/variants.py)."""
+        return variant_urls(self.image_filename)
+
     class Config:
         from_attributes = True
 
@@ -52,4 +60,12 @@ class ReportListItem(BaseModel):
         
 class BatchDeleteRequest(BaseModel):
     report_no: List[str]
+
+
+class CardExportRequest(BaseModel):
+    # filters combine with AND; at least one is required
+    report_no: Optional[List[str]] = None
+    style_number: Optional[str] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
     
\ No newline at end of file
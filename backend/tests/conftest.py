@@ -0,0 +1,44 @@
+import os
+import sys
+import tempfile
+
+# The app reads its database and folders from the environment at import time,
+# so point them at a scratch directory before anything from the backend is imported.
+_TMP = tempfile.mkdtemp(prefix="igi-tests-")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_TMP, "test.db")
+os.environ["UPLOAD_DIR"] = os.path.join(_TMP, "uploads")
+os.environ["OUTPUT_DIR"] = os.path.join(_TMP, "output")
+os.environ["GC_INTERVAL_HOURS"] = "0"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from auth.dependencies import get_current_user
+from database import Base, SessionLocal, engine
+import models  # noqa: F401  (registers the tables)
+from reports.router import public_router, router as reports_router, variants_router
+
+
+@pytest.fixture
+def db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(reports_router)
+    app.include_router(public_router)
+    app.include_router(variants_router)
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "tests"}
+    with TestClient(app) as c:
+        yield c
@@ -0,0 +1,77 @@
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+
+from models import Report
+from reports.backup import BACKUP_COLUMNS
+
+
+def _archive(rows):
+    frame = pd.DataFrame([
+        {
+            "report_no": no,
+            "description": description,
+            "shape_and_cut": "(12) Round Brilliant",
+            "tot_est_weight": "0.50",
+            "style_number": f"S-{no}",
+            "isecopy": False,
+            "notice_image": False,
+            "igi_logo": False,
+            "created_at": "2024-01-01T00:00:00",
+        }
+        for no, description in rows
+    ], columns=BACKUP_COLUMNS)
+    xlsx = io.BytesIO()
+    frame.to_excel(xlsx, sheet_name="reports", index=False)
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("reports.xlsx", xlsx.getvalue())
+    return buf.getvalue()
+
+
+def _restore(client, archive, overwrite):
+    res = client.post(
+        "/reports/import-backup",
+        files={"file": ("backup.zip", archive, "application/zip")},
+        data={"overwrite": "true" if overwrite else "false"},
+    )
+    assert res.status_code == 200, res.text
+    return res.json()
+
+
+DUPLICATED = [("R1", "first"), ("R2", "only"), ("R1", "second"), ("R1", "third")]
+
+
+def test_duplicate_report_nos_without_overwrite_keep_the_first_row(client, db):
+    result = _restore(client, _archive(DUPLICATED), overwrite=False)
+
+    assert result["imported"] == 2
+    assert result["updated"] == 0
+    assert sorted(result["skipped"]) == ["R1", "R1"]
+    assert db.query(Report).filter_by(report_no="R1").one().description == "first"
+
+
+def test_duplicate_report_nos_with_overwrite_keep_the_last_row(client, db):
+    result = _restore(client, _archive(DUPLICATED), overwrite=True)
+
+    assert result["imported"] == 2
+    assert result["updated"] == 2
+    assert result["skipped"] == []
+    assert db.query(Report).filter_by(report_no="R1").one().description == "third"
+
+
+@pytest.mark.parametrize("overwrite", [False, True])
+def test_duplicates_of_an_existing_report(client, db, overwrite):
+    _restore(client, _archive([("R1", "stored")]), overwrite=False)
+
+    result = _restore(client, _archive([("R1", "a"), ("R1", "b")]), overwrite=overwrite)
+
+    description = db.query(Report).filter_by(report_no="R1").one().description
+    if overwrite:
+        assert (result["imported"], result["updated"], result["skipped"]) == (0, 2, [])
+        assert description == "b"
+    else:
+        assert (result["imported"], result["updated"], result["skipped"]) == (0, 0, ["R1", "R1"])
+        assert description == "stored"
@@ -0,0 +1,126 @@
+import io
+import json
+import zipfile
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import executors
+from auth.dependencies import get_current_user
+from pdf import bulk, cache
+
+
+def _client():
+    app = FastAPI()
+    app.include_router(bulk.router)
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "tests"}
+    return TestClient(app)
+
+
+@pytest.fixture
+def bulk_client(monkeypatch):
+    parsed = []
+
+    async def fake_parse(mode, pdf_bytes, filename, timeout=None):
+        parsed.append((mode, filename))
+        if b"unreadable" in pdf_bytes:
+            return {"error": "Could not read the report"}
+        return {"REPORT_NUMBER": filename}
+
+    monkeypatch.setattr(bulk, "parse_pdf_cached", fake_parse)
+    with _client() as c:
+        c.parsed = parsed
+        yield c
+
+
+def _zip(members):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, data in members.items():
+            if name.endswith("/"):
+                zf.writestr(zipfile.ZipInfo(name), b"")
+            else:
+                zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def _post(client, files, **form):
+    return client.post("/pdf/bulk", files=[("files", f) for f in files], data=form)
+
+
+def _lines(res):
+    assert res.status_code == 200, res.text
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in res.text.splitlines()]
+
+
+def test_one_line_per_pdf_then_a_summary(bulk_client):
+    res = _post(bulk_client, [
+        ("a.pdf", b"%PDF a", "application/pdf"),
+        ("b.pdf", b"not a pdf at all", "application/pdf"),
+        ("c.pdf", b"%PDF unreadable", "application/pdf"),
+    ])
+    lines = _lines(res)
+
+    assert lines[-1] == {"summary": {"total": 3, "ok": 1, "failed": 2}}
+    by_index = {line["index"]: line for line in lines[:-1]}
+    assert sorted(by_index) == [0, 1, 2]
+    assert by_index[0] == {"index": 0, "filename": "a.pdf", "status": "ok", "result": {"REPORT_NUMBER": "a.pdf"}}
+    assert by_index[1] == {"index": 1, "filename": "b.pdf", "status": "error", "error": "not a PDF file"}
+    assert by_index[2]["status"] == "error" and by_index[2]["error"] == "Could not read the report"
+
+
+def test_broken_pdf_is_an_error_line_from_the_real_parser(monkeypatch, tmp_path):
+    monkeypatch.setattr(executors, "PDF_WORKERS", 1)
+    monkeypatch.setattr(executors, "_pdf_pool", None)
+    monkeypatch.setattr(cache, "cache_root", lambda mode: str(tmp_path / mode))
+    try:
+        with _client() as c:
+            lines = _lines(_post(c, [("broken.pdf", b"%PDF-1.4 truncated", "application/pdf")]))
+    finally:
+        if executors._pdf_pool is not None:
+            executors._pdf_pool.shutdown(wait=True)
+
+    assert lines[-1] == {"summary": {"total": 1, "ok": 0, "failed": 1}}
+    assert lines[0]["index"] == 0 and lines[0]["status"] == "error"
+    assert lines[0]["error"].startswith("Error opening PDF")
+
+
+def test_zip_members_are_expanded_skipping_folders_and_resource_forks(bulk_client):
+    archive = _zip({
+        "batch/": b"",
+        "batch/one.pdf": b"%PDF one",
+        "batch/._one.pdf": b"\x00\x05\x16\x07",
+        "batch/notes.txt": b"hello",
+        "two.PDF": b"%PDF two",
+    })
+    res = _post(bulk_client, [("reports.zip", archive, "application/zip")], mode="mini")
+    lines = _lines(res)
+
+    assert lines[-1] == {"summary": {"total": 2, "ok": 2, "failed": 0}}
+    assert sorted(line["filename"] for line in lines[:-1]) == ["batch/one.pdf", "two.PDF"]
+    assert sorted(bulk_client.parsed) == [("mini", "one.pdf"), ("mini", "two.PDF")]
+
+
+def test_too_many_pdfs_is_400(bulk_client, monkeypatch):
+    monkeypatch.setattr(bulk, "BULK_PDF_MAX_FILES", 2)
+    archive = _zip({f"{i}.pdf": b"%PDF" for i in range(3)})
+
+    res = _post(bulk_client, [("reports.zip", archive, "application/zip")])
+    assert res.status_code == 400
+    assert "At most 2" in res.json()["detail"]
+    assert bulk_client.parsed == []
+
+
+def test_bad_requests_are_400(bulk_client):
+    res = _post(bulk_client, [("a.pdf", b"%PDF a", "application/pdf")], mode="huge")
+    assert res.status_code == 400
+
+    res = _post(bulk_client, [("broken.zip", b"PK not really", "application/zip")])
+    assert res.status_code == 400
+    assert "not a valid zip" in res.json()["detail"]
+
+    res = _post(bulk_client, [("empty.zip", _zip({"readme.txt": b"hi"}), "application/zip")])
+    assert res.status_code == 400
+    assert res.json()["detail"] == "No PDF files found in the upload"
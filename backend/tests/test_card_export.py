@@ -0,0 +1,107 @@
+import io
+import os
+import shutil
+import zipfile
+from concurrent.futures import Future
+from datetime import datetime
+
+import reports.cards as cards
+from models import Report
+from reports.cards import CARD_CACHE_DIR, card_key, card_path, iter_rendered_cards
+
+
+def _report(db, report_no, style_number="S-1", created_at=None):
+    report = Report(report_no=report_no, description="One ring", shape_and_cut="(1) Round Brilliant",
+                    tot_est_weight="0.50", color="E", clarity="VS1", style_number=style_number,
+                    created_at=created_at)
+    db.add(report)
+    db.commit()
+    return report
+
+
+def _export(client, **body):
+    res = client.post("/reports/cards/export", json=body)
+    assert res.status_code == 200, res.text
+    assert res.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(res.content)) as zf:
+        assert "errors.txt" not in zf.namelist()
+        return zf.namelist()
+
+
+class _CountingPool:
+    """Stands in for the encode pool: renders on submit and counts what is outstanding."""
+
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, fn, *args):
+        self.submitted += 1
+        fut = Future()
+        fut.set_result(fn(*args))
+        return fut
+
+
+def test_export_by_report_no_sends_each_card_once(client, db):
+    for no in ("R1", "R2", "R3"):
+        _report(db, no)
+
+    assert _export(client, report_no=["R3", "R1", "R3", "NOPE"]) == ["R1.png", "R3.png"]
+
+
+def test_export_by_style_number(client, db):
+    _report(db, "R1", style_number="S-1")
+    _report(db, "R2", style_number="S-2")
+    _report(db, "R3", style_number="S-1")
+
+    assert _export(client, style_number="S-1") == ["R1.png", "R3.png"]
+    assert _export(client, report_no=["R1", "R2"], style_number="S-2") == ["R2.png"]
+
+
+def test_export_by_created_range_is_from_inclusive_to_exclusive(client, db):
+    _report(db, "R1", created_at=datetime(2024, 1, 1))
+    _report(db, "R2", created_at=datetime(2024, 1, 10))
+    _report(db, "R3", created_at=datetime(2024, 1, 20))
+
+    names = _export(client, created_from="2024-01-10T00:00:00", created_to="2024-01-20T00:00:00")
+    assert names == ["R2.png"]
+    assert _export(client, created_from="2024-01-10T00:00:00") == ["R2.png", "R3.png"]
+    assert _export(client, created_to="2024-01-10T00:00:00Z") == ["R1.png"]
+
+
+def test_export_with_no_match_is_404_and_no_filter_is_400(client, db):
+    _report(db, "R1")
+
+    assert client.post("/reports/cards/export", json={"report_no": ["NOPE"]}).status_code == 404
+    assert client.post("/reports/cards/export", json={"style_number": "S-9"}).status_code == 404
+    assert client.post("/reports/cards/export", json={}).status_code == 400
+
+
+def test_renders_in_flight_stay_bounded(db, monkeypatch):
+    pool = _CountingPool()
+    monkeypatch.setattr(cards, "get_encode_pool", lambda: pool)
+    shutil.rmtree(CARD_CACHE_DIR, ignore_errors=True)  # every card is a render
+    reports = [_report(db, f"R{i}") for i in range(7)]
+
+    consumed = 0
+    for report_no, data, error in iter_rendered_cards(reports, max_in_flight=3):
+        assert error is None and data
+        assert pool.submitted - consumed <= 3
+        consumed += 1
+    assert consumed == 7 and pool.submitted == 7
+
+
+def test_card_trimmed_after_it_was_queued_is_rendered_again(db, monkeypatch):
+    monkeypatch.setattr(cards, "get_encode_pool", _CountingPool)
+    reports = [_report(db, f"R{i}") for i in range(3)]
+    for _ in iter_rendered_cards(reports):
+        pass  # fills the cache
+
+    results = iter_rendered_cards(reports, max_in_flight=3)
+    first = next(results)  # all three are queued as cache hits by now
+    for report in reports[1:]:
+        os.remove(card_path(card_key(report)))
+    rest = list(results)
+
+    assert [r[0] for r in [first] + rest] == ["R0", "R1", "R2"]
+    assert all(error is None and data for _, data, error in rest)
+    assert all(os.path.exists(card_path(card_key(r))) for r in reports)
@@ -0,0 +1,71 @@
+import io
+
+from PIL import Image
+
+from models import Report
+from reports.cards import card_key
+from reports.storage import store_fileobj, upload_path
+
+
+def _report(db, report_no="R1", image_filename=None, **fields):
+    report = Report(report_no=report_no, description="One ring", shape_and_cut="(1) Round Brilliant",
+                    tot_est_weight="0.50", color="E", clarity="VS1", style_number=f"S-{report_no}",
+                    image_filename=image_filename, **fields)
+    db.add(report)
+    db.commit()
+    return report
+
+
+def _image(name, color=(200, 30, 30)):
+    png = io.BytesIO()
+    Image.new("RGB", (600, 400), color).save(png, format="PNG")
+    png.seek(0)
+    store_fileobj(png, upload_path(name))
+
+
+def test_same_content_gives_the_same_key(db):
+    _image("ring.png")
+    report = _report(db, image_filename="ring.png")
+    key = card_key(report)
+
+    db.expire_all()
+    assert card_key(db.query(Report).filter_by(report_no="R1").one()) == key
+
+
+def test_edited_field_or_image_gives_a_new_key(db):
+    _image("ring.png")
+    report = _report(db, image_filename="ring.png")
+    before = card_key(report)
+
+    report.color = "D"
+    db.commit()
+    edited = card_key(report)
+    assert edited != before
+
+    _image("ring.png", color=(30, 200, 30))  # same name, new content
+    assert card_key(report) != edited
+
+
+def test_card_png_revalidates_with_etag(client, db):
+    _image("ring.png")
+    _report(db, image_filename="ring.png")
+
+    res = client.get("/public-report/R1/card.png")
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "image/png"
+    assert Image.open(io.BytesIO(res.content)).size[0] > 0
+    etag = res.headers["etag"]
+
+    again = client.get("/public-report/R1/card.png", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+
+    res = client.put("/reports/R1", data={"clarity": "SI1"})
+    assert res.status_code == 200
+    changed = client.get("/public-report/R1/card.png", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_card_png_for_unknown_report_is_404(client, db):
+    assert client.get("/public-report/NOPE/card.png").status_code == 404
@@ -0,0 +1,84 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from fastapi import HTTPException
+
+import executors
+
+
+@pytest.fixture
+def tiny_pdf_pool(monkeypatch):
+    """One worker and one queued job: two pdf_slot() holders fill it up."""
+    monkeypatch.setattr(executors, "PDF_WORKERS", 1)
+    monkeypatch.setattr(executors, "PDF_QUEUE_SIZE", 1)
+    monkeypatch.setattr(executors, "PDF_WORKER_PRELOAD", ())
+    monkeypatch.setattr(executors, "_pdf_pool", None)
+    yield
+    if executors._pdf_pool is not None:
+        executors._pdf_pool.shutdown(wait=True, cancel_futures=True)
+
+
+async def _fill_slots():
+    slots = executors.PDF_WORKERS + executors.PDF_QUEUE_SIZE
+    executors._pdf_slots = asyncio.Semaphore(slots)
+    for _ in range(slots):
+        await executors._pdf_slots.acquire()
+
+
+def test_full_queue_is_503_with_retry_after(tiny_pdf_pool, monkeypatch):
+    monkeypatch.setattr(executors, "_pdf_slots", None)
+
+    async def scenario():
+        await _fill_slots()
+        for timeout in (0, 0.05):
+            with pytest.raises(HTTPException) as busy:
+                async with executors.pdf_slot(timeout):
+                    pass
+            assert busy.value.status_code == 503
+            assert busy.value.headers["Retry-After"] == "5"
+
+        executors._pdf_slots.release()
+        async with executors.pdf_slot(0):  # a free slot admits at once
+            assert executors._pdf_slots.locked()
+        assert not executors._pdf_slots.locked()
+
+    asyncio.run(scenario())
+
+
+def test_no_timeout_waits_for_a_slot(tiny_pdf_pool, monkeypatch):
+    monkeypatch.setattr(executors, "_pdf_slots", None)
+
+    async def scenario():
+        await _fill_slots()
+        admitted = asyncio.Event()
+
+        async def waiter():
+            async with executors.pdf_slot(None):
+                admitted.set()
+
+        task = asyncio.ensure_future(waiter())
+        await asyncio.sleep(0.1)
+        assert not admitted.is_set()  # still waiting, not turned away
+
+        executors._pdf_slots.release()
+        await asyncio.wait_for(task, 5)
+        assert admitted.is_set()
+
+    asyncio.run(scenario())
+
+
+def test_broken_pool_is_discarded_and_replaced(tiny_pdf_pool):
+    async def scenario():
+        pool = executors.get_pdf_pool()
+        assert isinstance(pool, ProcessPoolExecutor)
+        with pytest.raises(BrokenProcessPool):
+            await executors.run_in_pdf_pool(os._exit, 1)  # the worker dies mid-job
+        assert executors._pdf_pool is None
+
+        assert await executors.run_in_pdf_pool(abs, -3) == 3
+        assert executors.get_pdf_pool() is not pool
+
+    asyncio.run(scenario())
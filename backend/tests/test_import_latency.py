@@ -0,0 +1,67 @@
+"""Public report lookups keep being served while a backup restore runs (see executors.run_heavy)."""
+import threading
+
+import reports.router as reports_router
+from models import Report
+
+REPORTS = 20
+
+
+def _seed(db):
+    db.bulk_insert_mappings(Report, [
+        {
+            "report_no": f"R{i:06d}",
+            "description": "One 18K White Gold Ring, weighing in total 3.2g, containing, Twelve (12) Natural Diamonds",
+            "shape_and_cut": "(12) Round Brilliant",
+            "tot_est_weight": "0.50",
+            "style_number": f"S{i:06d}",
+        }
+        for i in range(REPORTS)
+    ])
+    db.commit()
+
+
+def test_lookups_are_served_while_the_restore_holds_the_heavy_pool(client, db, monkeypatch):
+    _seed(db)
+    archive = client.post("/reports/export-backup").content
+
+    entered = threading.Event()
+    release = threading.Event()
+    seen = {}
+    apply_backup_zip = reports_router._apply_backup_zip
+
+    def blocking_apply(*args, **kwargs):
+        seen["thread"] = threading.current_thread().name
+        entered.set()
+        assert release.wait(10), "the test never released the restore"
+        return apply_backup_zip(*args, **kwargs)
+
+    monkeypatch.setattr(reports_router, "_apply_backup_zip", blocking_apply)
+
+    result = {}
+
+    def restore():
+        res = client.post(
+            "/reports/import-backup",
+            files={"file": ("backup.zip", archive, "application/zip")},
+            data={"overwrite": "true"},
+        )
+        result["status"] = res.status_code
+
+    worker = threading.Thread(target=restore)
+    worker.start()
+    try:
+        assert entered.wait(10), "the restore never started"
+        assert seen["thread"].startswith("heavy-work")
+
+        # uncached lookups, so each one needs the database and a worker thread
+        for i in range(5):
+            res = client.get(f"/public-report/R{i:06d}")
+            assert res.status_code == 200
+            assert res.json()["report_no"] == f"R{i:06d}"
+        assert worker.is_alive()  # all served while the restore was still held
+    finally:
+        release.set()
+        worker.join(30)
+
+    assert result["status"] == 200
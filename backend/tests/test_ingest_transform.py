@@ -0,0 +1,156 @@
+"""
+transform_rows must build the strings the old per-row loop did, once every
+cell is cleaned: stripped text, "" for any kind of blank.
+"""
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+from num2words import num2words
+
+from reports.ingest import transform_rows
+
+COLUMNS = [
+    "Style Number", "Jewelry Description", "Metal Color", "Gross Weight", "No Of Diamonds",
+    "Shape", "Diamond Weight", "Color Criteria", "Clarity Criteria", "Comment", "IGI Logo",
+]
+
+
+def legacy_row(row, normalized_cols, diamond_type=None, comment=None, igi_logo=False):
+    """The text-building part of the loop transform_rows replaced, verbatim."""
+    style = str(row.get("Style Number", "")).strip()
+
+    comment_val = comment.strip() if comment else None
+    if not comment_val and "comment" in normalized_cols:
+        col_name = normalized_cols["comment"]
+        txt = str(row.get(col_name, "")).strip()
+        if txt:
+            comment_val = txt
+
+    try:
+        num_diamonds_int = int(float(str(row.get("No Of Diamonds", 0)).strip()))
+    except:  # noqa: E722
+        num_diamonds_int = 0
+    num_in_words = num2words(num_diamonds_int, to="cardinal").replace("-", " ").capitalize()
+
+    diamond_type_used = diamond_type.strip() if diamond_type else None
+    diamonds_phrase = diamond_type_used if diamond_type_used else "Natural Diamonds"
+
+    jewel_desc = str(row.get("Jewelry Description", "")).strip()
+    if jewel_desc.lower() in ["earring", "ear rings", "ear-ring", "ear-rings"]:
+        jewel_desc = "pair of earrings"
+
+    desc = (
+        f"One {row.get('Metal Color', '')} {jewel_desc}, "
+        f"weighing in total {row.get('Gross Weight', '')}g, containing, "
+        f"{num_in_words} ({num_diamonds_int}) {diamonds_phrase}"
+    )
+    shape = f"({num_diamonds_int}) {row.get('Shape', '')} Brilliant"
+
+    tot_raw = row.get("Diamond Weight", "")
+    if tot_raw not in [None, ""]:
+        try:
+            tot = f"{float(tot_raw):.2f}"
+        except ValueError:
+            tot = str(tot_raw).strip()
+    else:
+        tot = ""
+
+    igi_logo_val = bool(igi_logo)
+    if not igi_logo_val:
+        for key in ["igi_logo", "igi logo", "igi-logo"]:
+            if key in normalized_cols:
+                val = row.get(normalized_cols[key])
+                if val:
+                    igi_logo_val = str(val).strip().lower() in ["true", "1", "yes", "y"]
+                break
+
+    return {
+        "style_number": style,
+        "comment": comment_val,
+        "description": desc,
+        "shape_and_cut": shape,
+        "tot_est_weight": tot,
+        "color": row.get("Color Criteria", ""),
+        "clarity": row.get("Clarity Criteria", ""),
+        "igi_logo": igi_logo_val,
+    }
+
+
+CELL_CHOICES = {
+    "Style Number": lambda r: r.choice([f"ST-{r.randint(1, 999)}", f" S {r.randint(1, 99)} ", r.randint(1, 99), None]),
+    "Jewelry Description": lambda r: r.choice(["Ring", "Earring", " ear-rings ", "Pendant", None, 7]),
+    "Metal Color": lambda r: r.choice(["18K White Gold", "Yellow Gold", None, np.nan]),
+    "Gross Weight": lambda r: r.choice(["3.21", 3.21, 4, None, np.nan, "n/a"]),
+    "No Of Diamonds": lambda r: r.choice(["12", 12, 12.0, " 3 ", "x", None, np.nan, 0]),
+    "Shape": lambda r: r.choice(["Round", "Princess", None]),
+    "Diamond Weight": lambda r: r.choice(["0.5", 0.456, 1, "", "abc", None, np.nan]),
+    "Color Criteria": lambda r: r.choice(["E-F", "G", None, np.nan]),
+    "Clarity Criteria": lambda r: r.choice(["VS1", "SI2", None]),
+    "Comment": lambda r: r.choice(["", " note ", None, np.nan, 5]),
+    "IGI Logo": lambda r: r.choice(["yes", "No", "TRUE", 1, 0, True, False, "", None, np.nan]),
+}
+
+
+def random_frame(seed, rows=300):
+    r = random.Random(seed)
+    data = []
+    for _ in range(rows):
+        shape = r.random()
+        if shape < 0.25:
+            # only text and blanks
+            row = [r.choice(["text", " ring ", "12", "Yes", None, np.nan]) for _ in COLUMNS]
+        elif shape < 0.3:
+            # no text at all
+            row = [r.choice([1, 2.5, 0, True, None, np.nan]) for _ in COLUMNS]
+        else:
+            row = [CELL_CHOICES[c](r) for c in COLUMNS]
+        data.append(row)
+    df = pd.DataFrame(data, columns=COLUMNS, dtype=object)
+    df.index = df.index + 2  # sheet rows, as ingest_workbook keeps them
+    return df
+
+
+def cleaned(row):
+    return {k: "" if pd.isna(v) or str(v).strip() == "" else str(v).strip() for k, v in row.items()}
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("options", [
+    {},
+    {"diamond_type": " Lab Grown Diamonds ", "comment": " From form ", "igi_logo": True},
+])
+def test_transform_rows_matches_the_row_loop(seed, options):
+    df = random_frame(seed)
+    normalized_cols = {col.lower().strip(): col for col in df.columns}
+
+    out = transform_rows(df, **options)
+
+    for idx, row in df.iterrows():
+        expected = legacy_row(cleaned(row), normalized_cols, **options)
+        expected["color"] = expected["color"] or None
+        expected["clarity"] = expected["clarity"] or None
+        for field, value in expected.items():
+            got = out.at[idx, field]
+            if field == "igi_logo":
+                got = bool(got)
+            assert got == value and type(got) is type(value), (idx, field, got, value)
+
+
+def test_every_kind_of_blank_is_treated_alike():
+    df = pd.DataFrame({
+        "Style Number": ["S1", "S2", "S3", "S4"],
+        "Jewelry Description": ["Ring", "Ring", "Ring", "Ring"],
+        "Metal Color": [None, np.nan, pd.NaT, "   "],
+        "No Of Diamonds": [None, np.nan, pd.NaT, " "],
+        "Color Criteria": [None, np.nan, pd.NaT, ""],
+        "Comment": [None, np.nan, pd.NaT, "  "],
+    }, dtype=object)
+
+    out = transform_rows(df)
+
+    assert out["description"].nunique() == 1
+    assert out["description"].iloc[0] == "One  Ring, weighing in total g, containing, Zero (0) Natural Diamonds"
+    assert out["color"].tolist() == [None] * 4
+    assert out["comment"].tolist() == [None] * 4
@@ -0,0 +1,169 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from models import IngestJob
+from reports import jobs
+
+
+def _job(db, tmp_path, job_id, status="queued", updated_at=None):
+    workbook = tmp_path / f"{job_id}.xlsx"
+    workbook.write_bytes(b"xlsx")
+    job = IngestJob(id=job_id, status=status, workbook_path=str(workbook), params=json.dumps({}))
+    db.add(job)
+    db.commit()
+    if updated_at is not None:
+        db.query(IngestJob).filter(IngestJob.id == job_id).update({"updated_at": updated_at})
+        db.commit()
+    return workbook
+
+
+def test_a_job_runs_in_one_worker_only(db, tmp_path, monkeypatch):
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def fake_ingest(db, path, progress=None, **params):
+        calls.append(path)
+        started.set()
+        release.wait(5)
+        return {"inserted": 0}
+
+    monkeypatch.setattr(jobs, "ingest_workbook", fake_ingest)
+    workbook = _job(db, tmp_path, "job-1")
+
+    first = threading.Thread(target=jobs.run_ingest_job, args=("job-1",))
+    first.start()
+    assert started.wait(5)
+    jobs.run_ingest_job("job-1")  # a second worker picking up the same job
+    release.set()
+    first.join(5)
+
+    assert len(calls) == 1
+    db.expire_all()
+    assert db.get(IngestJob, "job-1").status == "done"
+    assert not workbook.exists()
+
+
+def test_failed_job_drops_its_workbook(db, tmp_path, monkeypatch):
+    def broken_ingest(db, path, progress=None, **params):
+        raise RuntimeError("bad sheet")
+
+    monkeypatch.setattr(jobs, "ingest_workbook", broken_ingest)
+    workbook = _job(db, tmp_path, "job-2")
+
+    jobs.run_ingest_job("job-2")
+
+    db.expire_all()
+    assert db.get(IngestJob, "job-2").status == "failed"
+    assert not workbook.exists()
+
+
+def test_resume_leaves_live_running_jobs_alone(db, tmp_path, monkeypatch):
+    queued = []
+    monkeypatch.setattr(jobs, "enqueue_ingest_job", queued.append)
+    long_ago = datetime.now(timezone.utc) - timedelta(seconds=jobs.INGEST_JOB_LEASE_SECONDS + 60)
+    _job(db, tmp_path, "live", status="running")
+    _job(db, tmp_path, "dead", status="running", updated_at=long_ago)
+    _job(db, tmp_path, "waiting", status="queued")
+
+    jobs.resume_ingest_jobs()
+
+    assert sorted(queued) == ["dead", "waiting"]
+    db.expire_all()
+    assert db.get(IngestJob, "live").status == "running"
+    assert db.get(IngestJob, "dead").status == "queued"
+
+
+class _Crash(BaseException):
+    """Stands in for the process dying: not caught by run_ingest_job's error handling."""
+
+
+def _workbook(path, styles):
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "sheet1"
+    ws.append(["Style Number", "Jewelry Description", "Metal Color", "Gross Weight", "No Of Diamonds",
+               "Shape", "Diamond Weight", "Color Criteria", "Clarity Criteria"])
+    for style in styles:
+        ws.append([style, "Ring", "18K White Gold", "3.2", "12", "Round", "0.5", "E-F", "VS1"])
+    wb.save(path)
+
+
+def test_resumed_job_continues_after_its_last_committed_batch(db, tmp_path, monkeypatch):
+    from reports import ingest
+
+    monkeypatch.setattr(ingest, "INGEST_BATCH_SIZE", 2)
+    styles = ["A1", "A2", "A3", "A1", "A4", "A5"]  # the second A1 is a real duplicate
+    workbook = tmp_path / "job-3.xlsx"
+    _workbook(workbook, styles)
+    db.add(IngestJob(id="job-3", status="queued", workbook_path=str(workbook), params=json.dumps({})))
+    db.commit()
+
+    real_ingest = jobs.ingest_workbook
+
+    def crash_after_first_batch(*args, checkpoint, **kwargs):
+        def save_then_die(state):
+            checkpoint(state)
+            raise _Crash()
+        return real_ingest(*args, checkpoint=save_then_die, **kwargs)
+
+    monkeypatch.setattr(jobs, "ingest_workbook", crash_after_first_batch)
+    try:
+        jobs.run_ingest_job("job-3")
+    except _Crash:
+        pass
+    db.expire_all()
+    job = db.get(IngestJob, "job-3")
+    assert job.status == "running"
+    assert json.loads(job.checkpoint)["offset"] == 2
+
+    # the worker never came back: its lease runs out and the sweep hands the job on
+    monkeypatch.setattr(jobs, "ingest_workbook", real_ingest)
+    monkeypatch.setattr(jobs, "enqueue_ingest_job", jobs.run_ingest_job)
+    long_ago = datetime.now(timezone.utc) - timedelta(seconds=jobs.INGEST_JOB_LEASE_SECONDS + 60)
+    db.query(IngestJob).filter(IngestJob.id == "job-3").update({"updated_at": long_ago})
+    db.commit()
+    assert jobs.requeue_stale_jobs() == 1
+
+    db.expire_all()
+    job = db.get(IngestJob, "job-3")
+    assert job.status == "done"
+    assert job.checkpoint is None
+    result = json.loads(job.result)
+    assert [r["style_number"] for r in result["uploaded"]] == ["A1", "A2", "A3", "A4", "A5"]
+    assert result["skipped"] == ["A1"]
+    assert (job.rows_done, job.rows_skipped, job.rows_failed) == (6, 1, 0)
+
+
+def test_sweep_leaves_fresh_jobs_alone(db, tmp_path, monkeypatch):
+    queued = []
+    monkeypatch.setattr(jobs, "enqueue_ingest_job", queued.append)
+    _job(db, tmp_path, "running-now", status="running")
+    _job(db, tmp_path, "just-queued", status="queued")
+
+    assert jobs.requeue_stale_jobs() == 0
+    assert queued == []
+
+
+def test_heartbeat_renews_the_lease(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "INGEST_JOB_HEARTBEAT_SECONDS", 0.05)
+    long_ago = datetime.now(timezone.utc) - timedelta(seconds=jobs.INGEST_JOB_LEASE_SECONDS + 60)
+    _job(db, tmp_path, "busy", status="running", updated_at=long_ago)
+
+    stop = threading.Event()
+    beat = threading.Thread(target=jobs._heartbeat, args=("busy", stop))
+    beat.start()
+    try:
+        time.sleep(0.3)
+    finally:
+        stop.set()
+        beat.join(5)
+
+    queued = []
+    monkeypatch.setattr(jobs, "enqueue_ingest_job", queued.append)
+    assert jobs.requeue_stale_jobs() == 0
+    assert queued == []
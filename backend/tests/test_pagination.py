@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+from models import Report
+
+
+def _add_reports(db, count, start=0, created_at=None):
+    for i in range(start, start + count):
+        db.add(Report(
+            report_no=f"R{i:04d}",
+            description="d",
+            shape_and_cut="s",
+            tot_est_weight="1",
+            style_number=f"S{i:04d}",
+            created_at=created_at(i) if created_at else None,
+        ))
+    db.commit()
+
+
+def _walk(client, **params):
+    seen = []
+    cursor = None
+    for _ in range(100):
+        query = dict(params, size=10)
+        if cursor:
+            query["cursor"] = cursor
+        res = client.get("/reports/", params=query)
+        assert res.status_code == 200
+        body = res.json()
+        seen += [item["report_no"] for item in body["items"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            return seen
+    raise AssertionError("next_cursor never ran out")
+
+
+def test_cursor_walks_every_row_once(client, db):
+    # server_default timestamps (no fraction on SQLite), many sharing a second
+    _add_reports(db, 25)
+    # timestamps written from Python (with microseconds), as a restore does
+    base = datetime(2020, 1, 1, 12, 0, 0)
+    _add_reports(db, 8, start=100, created_at=lambda i: base + timedelta(milliseconds=i % 3))
+
+    seen = _walk(client)
+
+    assert len(seen) == 33
+    assert len(set(seen)) == 33
+    expected = [r for (r,) in db.query(Report.report_no).order_by(Report.created_at.desc(), Report.id.desc())]
+    assert seen == expected
+
+
+def test_cursor_walks_a_search(client, db):
+    _add_reports(db, 25)
+
+    seen = _walk(client, q="R00")
+
+    assert sorted(seen) == [f"R{i:04d}" for i in range(25)]
+    assert len(set(seen)) == 25
+    # exact/prefix matches rank ahead of substring matches
+    assert seen[0].startswith("R00")
@@ -0,0 +1,119 @@
+import asyncio
+import hashlib
+import os
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import executors
+from pdf import cache
+
+
+def test_joined_parse_keeps_its_own_admission_wait(monkeypatch, tmp_path):
+    parses = []
+
+    async def fake_pool(fn, mode, pdf_bytes, filename, digest):
+        parses.append(digest)
+        return {"REPORT_NUMBER": "123"}
+
+    monkeypatch.setattr(cache, "run_in_pdf_pool", fake_pool)
+    monkeypatch.setattr(cache, "cache_root", lambda mode: str(tmp_path / mode))
+
+    async def scenario():
+        # one slot, taken by someone else's long parse
+        monkeypatch.setattr(executors, "_pdf_slots", asyncio.Semaphore(1))
+        await executors._pdf_slots.acquire()
+
+        upload = asyncio.ensure_future(cache.parse_pdf_cached("standard", b"%PDF same", "a.pdf", timeout=0.1))
+        await asyncio.sleep(0)
+        bulk = asyncio.ensure_future(cache.parse_pdf_cached("standard", b"%PDF same", "a.pdf", timeout=None))
+
+        with pytest.raises(HTTPException) as busy:
+            await upload
+        assert busy.value.status_code == 503
+
+        await asyncio.sleep(0.1)
+        assert not bulk.done()  # still waiting for a slot, not failed with the upload's 503
+        executors._pdf_slots.release()
+        return await asyncio.wait_for(bulk, 5)
+
+    assert asyncio.run(scenario()) == {"REPORT_NUMBER": "123"}
+    assert len(parses) == 1
+
+
+@pytest.fixture
+def parses(monkeypatch, tmp_path):
+    """cache_root under tmp_path, the pool run in-process and _parse recorded."""
+    calls = []
+
+    def fake_parse(mode, pdf_bytes, filename, out_dir):
+        calls.append(out_dir)
+        if b"unreadable" in pdf_bytes:
+            return {"error": "Error opening PDF"}
+        return {"REPORT_NUMBER": "123"}
+
+    async def in_process(fn, *args):
+        return fn(*args)
+
+    monkeypatch.setattr(cache, "_parse", fake_parse)
+    monkeypatch.setattr(cache, "run_in_pdf_pool", in_process)
+    monkeypatch.setattr(cache, "cache_root", lambda mode: str(tmp_path / mode))
+    return calls
+
+
+def test_hit_returns_the_stored_result_without_parsing(parses):
+    first = asyncio.run(cache.parse_pdf_cached("standard", b"%PDF one", "a.pdf"))
+    again = asyncio.run(cache.parse_pdf_cached("standard", b"%PDF one", "b.pdf"))
+
+    assert first == again == {"REPORT_NUMBER": "123"}
+    assert len(parses) == 1
+    assert asyncio.run(cache.parse_pdf_cached("mini", b"%PDF one", "a.pdf")) == first
+    assert len(parses) == 2  # modes are cached apart
+
+
+def test_error_result_is_not_cached(parses):
+    digest = hashlib.sha256(b"%PDF unreadable").hexdigest()
+    for _ in range(2):
+        result = asyncio.run(cache.parse_pdf_cached("standard", b"%PDF unreadable", "a.pdf"))
+        assert result == {"error": "Error opening PDF"}
+        assert not os.path.exists(cache.entry_dir("standard", digest))
+    assert len(parses) == 2
+
+
+def test_partial_entry_is_reclaimed_only_once_stale(parses):
+    digest = hashlib.sha256(b"%PDF one").hexdigest()
+    entry = cache.entry_dir("standard", digest)
+    os.makedirs(entry)  # a parse that is still running, or died
+
+    assert cache.parse_and_store("standard", b"%PDF one", "a.pdf", digest) == {"REPORT_NUMBER": "123"}
+    assert parses == [None]  # parsed without caching, the entry left to its owner
+    assert cache.load_cached("standard", digest) is None
+
+    old = time.time() - cache.PDF_CACHE_STALE_SECONDS - 1
+    os.utime(entry, (old, old))
+    assert cache.parse_and_store("standard", b"%PDF one", "a.pdf", digest) == {"REPORT_NUMBER": "123"}
+    assert parses[-1] == entry
+    assert cache.load_cached("standard", digest) == {"REPORT_NUMBER": "123"}
+
+
+def test_eviction_removes_least_recent_entries_down_to_90_percent(monkeypatch, tmp_path):
+    monkeypatch.setattr(cache, "cache_root", lambda mode: str(tmp_path / mode))
+    now = time.time()
+    entries = []
+    for i in range(10):
+        entry = cache.entry_dir(cache.MODES[i % 2], f"{i:02d}" + "0" * 62)
+        os.makedirs(entry)
+        result = os.path.join(entry, cache.RESULT_NAME)
+        with open(result, "w") as f:
+            f.write("x" * 1000)
+        os.utime(result, (now - 100 + i, now - 100 + i))  # entry 0 is the least recent
+        entries.append(entry)
+    partial = cache.entry_dir("standard", "ff" + "0" * 62)
+    os.makedirs(partial)  # no result.json yet: never evicted
+
+    assert cache.evict_entries(max_bytes=10_000) == 0
+    # 10,000 bytes against a 9,000 cap: down to 8,100 or less takes the two oldest
+    assert cache.evict_entries(max_bytes=9_000) == 2
+    assert [os.path.exists(e) for e in entries] == [False, False] + [True] * 8
+    assert os.path.exists(partial)
@@ -0,0 +1,43 @@
+from models import Report
+from reports.cache import TTLCache, public_report_cache
+
+
+def _report(db, report_no="R1", color="E"):
+    db.add(Report(report_no=report_no, description="d", shape_and_cut="s", tot_est_weight="1", color=color))
+    db.commit()
+
+
+def test_update_is_visible_to_the_next_lookup(client, db):
+    public_report_cache.clear()
+    _report(db)
+    assert client.get("/public-report/R1").json()["color"] == "E"
+
+    res = client.put("/reports/R1", data={"color": "D"})
+    assert res.status_code == 200, res.text
+
+    assert client.get("/public-report/R1").json()["color"] == "D"
+
+
+def test_invalidation_in_another_worker_reaches_this_one(client, db):
+    public_report_cache.clear()
+    _report(db)
+    assert client.get("/public-report/R1").json()["color"] == "E"
+
+    # another API process: its own in-memory cache, the same database
+    db.query(Report).filter_by(report_no="R1").update({"color": "F"})
+    db.commit()
+    other_worker = TTLCache(100, 300, shared="public_report")
+    other_worker.invalidate(["R1"])
+
+    assert client.get("/public-report/R1").json()["color"] == "F"
+
+
+def test_cached_lookup_is_served_without_the_database(client, db):
+    public_report_cache.clear()
+    _report(db)
+    assert client.get("/public-report/R1").json()["color"] == "E"
+
+    # a change that bypassed invalidation is not seen: the lookup really came from the cache
+    db.query(Report).filter_by(report_no="R1").update({"color": "G"})
+    db.commit()
+    assert client.get("/public-report/R1").json()["color"] == "E"
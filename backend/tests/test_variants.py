@@ -0,0 +1,72 @@
+import io
+
+import pytest
+from PIL import Image
+
+from reports.storage import resolve_upload, store_fileobj, upload_path
+from reports.variants import ensure_variant
+
+
+def _image(name, size=(1000, 500), color=(200, 30, 30)):
+    png = io.BytesIO()
+    Image.new("RGB", size, color).save(png, format="PNG")
+    png.seek(0)
+    store_fileobj(png, upload_path(name))
+
+
+@pytest.mark.parametrize("variant, fmt, size", [
+    ("thumb", "webp", (160, 80)),
+    ("thumb", "png", (160, 80)),
+    ("card", "webp", (480, 240)),
+    ("card", "png", (480, 240)),
+    ("full", "webp", (1000, 500)),
+])
+def test_variant_size_and_format(variant, fmt, size):
+    _image("ring.png")
+
+    path = ensure_variant("ring.png", variant, fmt)
+    with Image.open(path) as img:
+        assert img.format == fmt.upper()
+        assert img.size == size
+
+
+def test_full_png_is_the_original_upload():
+    _image("ring.png")
+    assert ensure_variant("ring.png", "full", "png") == resolve_upload("ring.png")
+
+
+def test_missing_source_has_no_variant():
+    assert ensure_variant("nope.png", "card", "webp") is None
+
+
+def test_variant_is_rendered_again_for_new_content():
+    _image("ring.png", color=(200, 30, 30))
+    with Image.open(ensure_variant("ring.png", "card", "png")) as img:
+        assert img.convert("RGB").getpixel((0, 0)) == (200, 30, 30)
+
+    _image("ring.png", color=(30, 200, 30))
+    with Image.open(ensure_variant("ring.png", "card", "png")) as img:
+        assert img.convert("RGB").getpixel((0, 0)) == (30, 200, 30)
+
+
+def test_variant_endpoint_serves_the_rendered_file(client):
+    _image("ring.png")
+
+    res = client.get("/image-variants/card/webp/ring.png")
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "image/webp"
+    assert "max-age" in res.headers["cache-control"]
+    assert Image.open(io.BytesIO(res.content)).size == (480, 240)
+
+
+@pytest.mark.parametrize("url", [
+    "/image-variants/huge/webp/ring.png",  # unknown variant
+    "/image-variants/card/gif/ring.png",  # unknown format
+    "/image-variants/card/webp/missing.png",
+    "/image-variants/card/webp/..%2F..%2Fetc%2Fpasswd",
+    "/image-variants/card/webp/..%5C..%5Cring.png",
+    "/image-variants/card/webp/.ring.png",
+])
+def test_variant_endpoint_404s(client, url):
+    _image("ring.png")
+    assert client.get(url).status_code == 404
@@ -61,12 +61,41 @@ def gen_report_no():
     # final report number
     return f"{prefix}{middle}{random_part}{yy}{mm}"
 
+# Card renderer settings; bump CARD_TEMPLATE_VERSION when the layout changes
+# so cached cards (reports/cards.py) are not reused.
+CARD_TEMPLATE_VERSION = 1
+CARD_SIZE = (1000, 600)
+CARD_QR_SIZE = 160
+CARD_QR_CACHE_SIZE = int(os.getenv("CARD_QR_CACHE_SIZE", "2048"))
+CARD_PNG_COMPRESS_LEVEL = int(os.getenv("CARD_PNG_COMPRESS_LEVEL", "6"))
+CARD_FIELDS = (
+    ("Report No", "report_no"),
+    ("Description", "description"),
+    ("Shape and Cut", "shape_and_cut"),
+    ("Tot. Est. Weight", "tot_est_weight"),
+    ("Color", "color"),
+    ("Clarity", "clarity"),
+    ("Style Number", "style_number"),
+)
+
+
 def create_qr(url: str) -> Image.Image:
     qr = qrcode.QRCode(box_size=4, border=2)
     qr.add_data(url)
     qr.make(fit=True)
     return qr.make_image(fill_color="black", back_color="white").convert("RGBA")
 
+
+@lru_cache(maxsize=CARD_QR_CACHE_SIZE)
+def card_qr(url: str) -> Image.Image:
+    """create_qr() scaled for the card, memoised. Shared: paste it, never draw on it."""
+    return create_qr(url).resize((CARD_QR_SIZE, CARD_QR_SIZE))
+
+
+def report_qr_url(report) -> str:
+    # Report has no qr_url column; objects that carry one (e.g. mini reports) win
+    return getattr(report, "qr_url", None) or f"https://igi.org.pe/?r={report.report_no}"
+
 @lru_cache(maxsize=1)
 def _fonts():
     try:
@@ -77,44 +106,42 @@ def _fonts():
         font_regular = ImageFont.load_default()
     return font_bold, font_regular
 
-def compose_card_image(report, thumbnail_path: str = None) -> bytes:
-    import os
-    W, H = 1000, 600
-    img = Image.new("RGB", (W, H), (255, 255, 255))
+
+@lru_cache(maxsize=1)
+def _card_template() -> Image.Image:
+    """White canvas with the header and field labels, drawn once per process."""
+    img = Image.new("RGB", CARD_SIZE, (255, 255, 255))
     draw = ImageDraw.Draw(img)
-    font_bold, font_regular = _fonts()
+    font_bold, _ = _fonts()
 
     draw.text((30, 20), "INTERNATIONAL GEMOLOGICAL INSTITUTE", font=font_bold, fill=(0,0,0))
     draw.text((30, 58), "JEWELRY REPORT", font=font_bold, fill=(0,0,0))
-    cur_y = 120
-
-    def draw_field(label, value):
-        nonlocal cur_y
-        draw.text((30, cur_y), f"{label} :", font=font_bold, fill=(0,0,0))
-        draw.text((250, cur_y), str(value or ""), font=font_regular, fill=(0,0,0))
-        cur_y += 30
-
-    draw_field("Report No", report.report_no)
-    draw_field("Description", report.description)
-    draw_field("Shape and Cut", report.shape_and_cut)
-    draw_field("Tot. Est. Weight", report.tot_est_weight)
-    draw_field("Color", report.color)
-    draw_field("Clarity", report.clarity)
-    draw_field("Style Number", report.style_number)
+    for i, (label, _) in enumerate(CARD_FIELDS):
+        draw.text((30, 120 + i * 30), f"{label} :", font=font_bold, fill=(0,0,0))
+    return img
+
+
+def compose_card_image(report, thumbnail_path: str = None) -> bytes:
+    img = _card_template().copy()
+    draw = ImageDraw.Draw(img)
+    _, font_regular = _fonts()
+
+    for i, (_, attr) in enumerate(CARD_FIELDS):
+        draw.text((250, 120 + i * 30), str(getattr(report, attr, None) or ""), font=font_regular, fill=(0,0,0))
 
     if thumbnail_path and os.path.exists(thumbnail_path):
         try:
-            thumb = Image.open(thumbnail_path).convert("RGBA")
+            with Image.open(thumbnail_path) as src:
+                thumb = src.convert("RGBA")
             thumb.thumbnail((240, 240))
             img.paste(thumb, (700, 120), thumb)
         except Exception:
             pass
 
-    qr = create_qr(report.qr_url or f"https://igi.org.pe/?r={report.report_no}")
-    qr = qr.resize((160, 160))
+    qr = card_qr(report_qr_url(report))
     img.paste(qr, (700, 380), qr)
 
     buf = io.BytesIO()
-    img.save(buf, format="PNG", optimize=True)
-    buf.seek(0)
-    return buf.read()
+    # optimize=True re-runs the encoder several times for a few % smaller files
+    img.save(buf, format="PNG", compress_level=CARD_PNG_COMPRESS_LEVEL)
+    return buf.getvalue()
@@ -8,7 +8,7 @@ import {
     StyleSheet,
 } from '@react-pdf/renderer';
 import { baseFont, commonStyles } from '../PDFStyles';
-import { BASE_URL } from '../../../lib/axiosClient';
+import { outputFileUrl } from '../../../lib/axiosClient';
 const styles = StyleSheet.create({
     diagramImage: {
         width: 180,
@@ -151,7 +151,7 @@ export default function InvoicePDFSection2({ data }: any) {
                 // alignSelf: 'center' // optional: center horizontally in parent
             }}>
                 <Image
-                    src={`${BASE_URL}/files/barcode12.png?t=${Date.now()}`}
+                    src={outputFileUrl(data, "BARCODE12", "barcode12.png")}
                     style={{
                         width: "100%",
                         // marginRight: 10,
@@ -243,7 +243,7 @@ export default function InvoicePDFSection2({ data }: any) {
             {proportionsImage && (
                 <View style={styles.imageWrapper}>
                     <Image
-                        src={`${BASE_URL}/files/proportions.png?t=${Date.now()}`}
+                        src={outputFileUrl(data, "PROPORTIONS", "proportions.png")}
                         style={styles.diagramImage}
                     />
                 </View>
@@ -331,7 +331,7 @@ export default function InvoicePDFSection2({ data }: any) {
             )}
             {/* <View style={{ flexDirection: "row", justifyContent: "center", alignItems: "center", marginTop: '66px', }}>
                 <Image
-                    src={`${BASE_URL}/files/barcode10.png`}
+                    src={outputFileUrl(data, "BARCODE10", "barcode10.png")}
                     style={{
                         width: 100,
                         height: 10,
@@ -359,7 +359,7 @@ export default function InvoicePDFSection2({ data }: any) {
                 }}
             >
                 <Image
-                    src={`${BASE_URL}/files/barcode10.png?t=${Date.now()}`}
+                    src={outputFileUrl(data, "BARCODE10", "barcode10.png")}
                     style={{
                         width: 100,
                         height: 10,
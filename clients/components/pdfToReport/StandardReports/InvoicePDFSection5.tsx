@@ -1,5 +1,5 @@
 /* eslint-disable jsx-a11y/alt-text */
-import { BASE_URL } from "../../../lib/axiosClient";
+import { outputFileUrl } from "../../../lib/axiosClient";
 import { View, Text, Image, StyleSheet } from "@react-pdf/renderer";
 
 // eslint-disable-next-line @typescript-eslint/no-explicit-any
@@ -9,7 +9,7 @@ export default function InvoicePDFSection5({ data }: { data: any }) {
             {/* QR Code */}
             <View style={styles.qrContainer}>
                 <Image
-                    src={`${BASE_URL}/files/qrcode.png?t=${Date.now()}`}
+                    src={outputFileUrl(data, "QRCODE", "qrcode.png")}
                     style={styles.qrImage}
                 />
             </View>
@@ -17,7 +17,7 @@ export default function InvoicePDFSection5({ data }: { data: any }) {
             {/* Barcode and number */}
             <View style={styles.barcodeRow}>
                 <Image
-                    src={`${BASE_URL}/files/barcode10.png?t=${Date.now()}`}
+                    src={outputFileUrl(data, "BARCODE10", "barcode10.png")}
                     style={styles.barcodeImage}
                 />
                 <Text style={styles.barcodeText}>
@@ -21,6 +21,16 @@ export function getCookieFromDocument(name: string): string | null {
  */
 
 export const BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL;
+
+/**
+ * URL of an asset produced by /pdf/upload-pdf/. Every upload gets its own output
+ * folder, listed in the response's URLS map; `fallback` is the old shared file name.
+ */
+// eslint-disable-next-line @typescript-eslint/no-explicit-any
+export function outputFileUrl(data: any, key: string, fallback: string): string {
+  const path = data?.URLS?.[key];
+  return path ? `${BASE_URL}${path}` : `${BASE_URL}/files/${fallback}?t=${Date.now()}`;
+}
 export function createAxiosClient(opts?: { token?: string; baseURL?: string }) {
   const baseURL = opts?.baseURL ?? process.env.NEXT_PUBLIC_API_BASE_URL ?? "";
   console.log("baseURL", baseURL);